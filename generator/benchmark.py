@@ -0,0 +1,335 @@
+# Offline generator benchmarks, replayed from the pages cached in scrape/ (run main.py once beforehand to fill it)
+#
+#   python benchmark.py [benchmarks...] [--rounds N] [--wiki-url URL] [--uncompiled]
+#                       [--save-baseline [PATH]] [--baseline [PATH]] [--threshold RATIO]
+#
+# pages            parses every cached page, per page type
+#                  --uncompiled constructs every CSSSelector on the spot, like the scraper used to
+# scrape           end-to-end scrape() of the cached wiki
+# gluadump         gluadump.json load and resolve, and the merge into the scrape (needs gluadump.json)
+# resolve          resolves cyclic references in generated dumps of increasing size
+# language_server  language_server() over the scrape
+# callbacks        callback parameter extraction over every function-typed argument description
+# sidebar          parse_sidebar() of the cached sidebar, against the full-document selector scans it used to run
+#                  (tests/test_sidebar.py checks that both come out the same)
+# importtime       what main.py merge and emit import, running each of them with -X importtime on a small
+#                  scrape in a scratch directory, and checks that none of them pull in lxml or urllib3
+#
+# Without any benchmark names, all of them are run. Nothing is ever requested from the network,
+# a page missing from the cache is an error.
+#
+# --save-baseline stores the results (default scrape/benchmark.json), --baseline compares against them
+# and exits with 1 if anything got slower than --threshold times its baseline (default 1.25)
+
+from collections.abc import Mapping
+import contextlib
+import copy
+import io
+import json
+import os.path
+import sys
+import time
+import random
+import subprocess
+import tempfile
+
+from lxml.cssselect import CSSSelector
+
+import scrape
+import gluadump
+from language_server import language_server
+from callbacks import parse_callback_params
+from cli import get_arg_value
+
+BASELINE_PATH = "scrape/benchmark.json"
+
+class OfflineError(Exception):
+	pass
+
+class OfflinePoolManager:
+	def request(self, method, url, **kwargs):
+		raise OfflineError("{url} isn't in the cache, run main.py to fill it before benchmarking".format(url = url))
+
+def best_of(rounds, run, setup=None):
+	best = None
+	for _ in range(rounds):
+		args = setup() if setup else ()
+
+		start = time.perf_counter()
+		run(*args)
+		elapsed = time.perf_counter() - start
+
+		if best is None or elapsed < best: best = elapsed
+	return best
+
+def get_wiki_url():
+	return get_arg_value("--wiki-url", scrape.WIKI_URL)
+
+def collect_pages(parser):
+	parser.parse_sidebar()
+
+	pages = []
+	while not parser.PAGE_PARSE_QUEUE.empty():
+		process, url, page_def = parser.PAGE_PARSE_QUEUE.get()
+		pages.append((process, parser.fetch_wiki_page(url), page_def))
+	return pages
+
+def bench_pages(rounds):
+	if "--uncompiled" in sys.argv:
+		scrape.selector = CSSSelector
+
+	parser = scrape.WikiParser(cached=True, quiet=True, wiki_url=get_wiki_url())
+	pages = collect_pages(parser)
+
+	# Best round for each page type
+	timings = {}
+	for _ in range(rounds):
+		round_timings = {}
+		for process, body, page_def in pages:
+			page_def = copy.deepcopy(page_def)
+
+			start = time.perf_counter()
+			process(parser.get_wiki_page_markup(body), page_def)
+			elapsed = time.perf_counter() - start
+
+			count, total = round_timings.get(process.__name__, (0, 0))
+			round_timings[process.__name__] = (count + 1, total + elapsed)
+
+		for name, (count, total) in round_timings.items():
+			if name not in timings or total < timings[name][1]:
+				timings[name] = (count, total)
+
+	results = {}
+	print("{:<16} {:>8} {:>14} {:>12}".format("parser", "pages", "per page (us)", "total (ms)"))
+	all_count, all_total = 0, 0
+	for name, (count, total) in sorted(timings.items()):
+		print("{:<16} {:>8} {:>14.1f} {:>12.1f}".format(name, count, total / count * 1e6, total * 1e3))
+		results["pages." + name] = total / count
+		all_count += count
+		all_total += total
+	print("{:<16} {:>8} {:>14.1f} {:>12.1f}".format("all", all_count, all_total / max(all_count, 1) * 1e6, all_total * 1e3))
+	results["pages.all"] = all_total / max(all_count, 1)
+
+	return results
+
+def bench_scrape(rounds):
+	elapsed = best_of(rounds, lambda: scrape.scrape(cached=True, quiet=True, wiki_url=get_wiki_url()))
+	print("scrape() {:.1f}ms".format(elapsed * 1e3))
+	return {"scrape": elapsed}
+
+def bench_gluadump(rounds):
+	if not os.path.exists(gluadump.GLUADUMP_PATH) or os.path.getsize(gluadump.GLUADUMP_PATH) == 0:
+		print("Skipped, " + gluadump.GLUADUMP_PATH + " is missing")
+		return {}
+
+	wiki_scrape = scrape.scrape(cached=True, quiet=True, wiki_url=get_wiki_url())
+	dump = gluadump.load_gluadump(cache_path=None)
+
+	results = {
+		"gluadump.load": best_of(rounds, lambda: gluadump.load_gluadump(cache_path=None)),
+		"gluadump.inject": best_of(rounds, lambda wiki_scrape: gluadump.inject_src(dump, wiki_scrape), lambda: (copy.deepcopy(wiki_scrape),)),
+	}
+	for name, elapsed in results.items():
+		print("{} {:.1f}ms".format(name, elapsed * 1e3))
+	return results
+
+# Libraries of functions with nested tables, where every few libraries are aliases of another one
+def generate_gluadump(libraries, members, seed=0):
+	rng = random.Random(seed)
+
+	dump = {"metatables": {}}
+	for i in range(libraries):
+		library = {"members": {}}
+		for j in range(members):
+			library["members"]["Func" + str(j)] = {"src": {"shared": ["lua/includes/lib" + str(i) + ".lua", j, j + 1]}}
+		library["members"]["Sub"] = {"members": {"Deep": {"src": {"shared": ["lua/includes/lib" + str(i) + ".lua", 0, 1]}}}}
+
+		if i > 0 and rng.random() < 0.2:
+			alias = "lib" + str(rng.randrange(i))
+			library["cyclic"] = {"client": alias}
+			library["members"]["Sub"]["cyclic"] = {"server": alias + ".Sub"}
+
+		dump["lib" + str(i)] = library
+	return dump
+
+def bench_resolve(rounds):
+	results = {}
+	print("{:>10} {:>10} {:>14}".format("libraries", "entries", "resolve (ms)"))
+	for libraries in [100, 1000, 10000]:
+		elapsed = best_of(rounds, gluadump.resolve_cyclic, lambda: (generate_gluadump(libraries, 10),))
+		print("{:>10} {:>10} {:>14.1f}".format(libraries, libraries * 12, elapsed * 1e3))
+		results["resolve." + str(libraries)] = elapsed
+	return results
+
+def bench_language_server(rounds):
+	wiki_scrape = scrape.scrape(cached=True, quiet=True, wiki_url=get_wiki_url())
+
+	results = {
+		"language_server": best_of(rounds, lambda: language_server(wiki_scrape)),
+	}
+	for name, elapsed in results.items():
+		print("{} {:.1f}ms".format(name, elapsed * 1e3))
+	return results
+
+def bench_callbacks(rounds):
+	wiki_scrape = scrape.scrape(cached=True, quiet=True, wiki_url=get_wiki_url())
+
+	descriptions = []
+	def step(obj):
+		if isinstance(obj, Mapping):
+			if obj.get("TYPE") == "function" and "DESCRIPTION" in obj: descriptions.append(obj["DESCRIPTION"])
+			for value in obj.values(): step(value)
+		elif type(obj) is list:
+			for value in obj: step(value)
+	step(wiki_scrape)
+
+	elapsed = best_of(rounds, lambda: [parse_callback_params(description) for description in descriptions])
+	size = sum(len(description) for description in descriptions)
+	print("{count} descriptions, {size} characters: {elapsed:.2f}ms, {per:.1f}us each, {rate:.1f}MB/s".format(count = len(descriptions), size = size, elapsed = elapsed * 1e3, per = elapsed / max(len(descriptions), 1) * 1e6, rate = size / elapsed / 1e6 if elapsed > 0 else 0))
+	return {"callbacks": elapsed}
+
+# The sidebar as it used to be sorted out, with a selector scan over the whole document per kind of link
+class SelectorSidebarParser(scrape.WikiParser):
+	def get_sidebar_nodes(self):
+		return tuple(scrape.selector(css)(self.TREE) for css in ("a.cm.panel", "a.cm.event", "a.cm.enum", "details.level1"))
+
+	def get_subcategory_name(self, subcategory):
+		return (scrape.selector("summary > a")(subcategory) or scrape.selector("a")(subcategory))[0].text_content().strip()
+
+def parse_sidebar_skeleton(parser_class, wiki_url, cached=True):
+	parser = parser_class(cached=cached, quiet=True, wiki_url=wiki_url)
+	# parse_sidebar announces every category whether it's quiet or not
+	with contextlib.redirect_stdout(io.StringIO()):
+		parser.parse_sidebar()
+
+	queue = []
+	while not parser.PAGE_PARSE_QUEUE.empty():
+		process, url, page_def = parser.PAGE_PARSE_QUEUE.get()
+		queue.append((process.__name__, url, page_def))
+	return json.dumps([parser.PARSED, queue])
+
+def bench_sidebar(rounds):
+	results = {
+		"sidebar": best_of(rounds, lambda: parse_sidebar_skeleton(scrape.WikiParser, get_wiki_url())),
+		"sidebar.selectors": best_of(rounds, lambda: parse_sidebar_skeleton(SelectorSidebarParser, get_wiki_url())),
+	}
+	for name, elapsed in results.items():
+		print("{} {:.1f}ms".format(name, elapsed * 1e3))
+	return results
+
+# The stages after scrape and the flags that make them import everything they can
+IMPORTTIME_STAGES = {
+	"merge": [],
+	"emit": ["--gzip", "--bundle"],
+}
+
+# Only scraping needs these
+SCRAPE_ONLY_MODULES = ("lxml", "cssselect", "urllib3")
+
+# Just enough of a scrape for every stage to run through
+IMPORTTIME_SCRAPE = {
+	"GLOBALS": {"print": {"SEARCH": "print", "LINK": "Global.print", "CLIENT": True, "SERVER": True, "DESCRIPTION": "Writes to the console."}},
+	"HOOKS": {},
+	"PANELS": {},
+	"ENUMS": {},
+	"CLASSES": {},
+	"LIBRARIES": {},
+	"STRUCTS": {},
+}
+
+def write_file(path, text):
+	f = open(path, "w", encoding="utf-8", newline="\n")
+	f.write(text)
+	f.close()
+
+# Module -> self import time in seconds, from a fresh main.py <stage> --input <scrape> run. main.py writes to scrape/
+# and ../resources/, so it runs from a scratch generator/ next to a scratch resources/
+def get_import_times(stage, flags):
+	with tempfile.TemporaryDirectory() as directory:
+		cwd = os.path.join(directory, "generator")
+		os.makedirs(cwd)
+		os.makedirs(os.path.join(directory, "resources"))
+		write_file(os.path.join(cwd, "input.json"), json.dumps(IMPORTTIME_SCRAPE))
+		write_file(os.path.join(cwd, "gluadump.json"), "{}")
+
+		main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+		result = subprocess.run([sys.executable, "-X", "importtime", main_path, stage, "--input", "input.json"] + flags, capture_output=True, text=True, check=True, cwd=cwd)
+
+	times = {}
+	for line in result.stderr.splitlines():
+		# import time: self [us] | cumulative | imported package
+		if not line.startswith("import time:") or "self [us]" in line: continue
+		self_time, _, name = line[len("import time:"):].split("|")
+		times[name.strip()] = int(self_time) / 1e6
+	return times
+
+def bench_importtime(rounds):
+	results = {}
+	failed = []
+	print("{:<10} {:>8} {:>10}".format("stage", "modules", "time (ms)"))
+	for stage, flags in IMPORTTIME_STAGES.items():
+		best = None
+		for _ in range(rounds):
+			times = get_import_times(stage, flags)
+			if best is None or sum(times.values()) < sum(best.values()): best = times
+
+		print("{:<10} {:>8} {:>10.1f}".format(stage, len(best), sum(best.values()) * 1e3))
+		results["importtime." + stage] = sum(best.values())
+		if any(name.split(".")[0] in SCRAPE_ONLY_MODULES for name in best): failed.append(stage)
+
+	if len(failed) > 0:
+		print("FAILED, " + ", ".join(failed) + " imports what only scrape needs")
+		sys.exit(1)
+	return results
+
+BENCHMARKS = {
+	"pages": bench_pages,
+	"scrape": bench_scrape,
+	"gluadump": bench_gluadump,
+	"resolve": bench_resolve,
+	"language_server": bench_language_server,
+	"callbacks": bench_callbacks,
+	"sidebar": bench_sidebar,
+	"importtime": bench_importtime,
+}
+
+def compare_baseline(results, baseline, threshold):
+	regressed = False
+	print("{:<28} {:>12} {:>12} {:>8}".format("benchmark", "baseline", "now", "ratio"))
+	for name, elapsed in results.items():
+		if name not in baseline: continue
+		ratio = elapsed / baseline[name]
+		print("{:<28} {:>10.3f}ms {:>10.3f}ms {:>7.2f}x{}".format(name, baseline[name] * 1e3, elapsed * 1e3, ratio, " REGRESSED" if ratio > threshold else ""))
+		regressed = regressed or ratio > threshold
+	return regressed
+
+def get_path_arg(name, default):
+	path = get_arg_value(name, default)
+	return default if path.startswith("--") or path in BENCHMARKS else path
+
+def main():
+	scrape.http = OfflinePoolManager()
+
+	rounds = int(get_arg_value("--rounds", 5))
+
+	results = {}
+	for name in [arg for arg in sys.argv[1:] if arg in BENCHMARKS] or list(BENCHMARKS):
+		print("=========== " + name + " ===========")
+		results.update(BENCHMARKS[name](rounds))
+
+	if "--save-baseline" in sys.argv:
+		f = open(get_path_arg("--save-baseline", BASELINE_PATH), "w", encoding="utf-8", newline="\n")
+		f.write(json.dumps(results, indent="\t"))
+		f.close()
+
+	if "--baseline" in sys.argv:
+		f = open(get_path_arg("--baseline", BASELINE_PATH), "r", encoding="utf-8")
+		baseline = json.loads(f.read())
+		f.close()
+
+		print("=========== baseline ===========")
+		if compare_baseline(results, baseline, float(get_arg_value("--threshold", 1.25))):
+			sys.exit(1)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,286 @@
+# Binary, memory-mappable version of wiki.json, written by main.py --bundle
+#
+#   python bundle.py [wiki.json] [wiki.bundle]
+#
+# writes the bundle for wiki.json (default ../resources/wiki.json) and reads it back to check it comes out the same
+#
+# Layout, all little-endian, every offset counted from the start of the file:
+#
+#   header      HEADER, see below
+#   flags       u32 string per flag bit, the keys that are stored as bits when they're True
+#   strings     u32 offset per string plus one past the end, into the string data
+#   string data UTF-8, no terminators
+#   nodes       NODE per node, in depth-first order so every category is one contiguous run
+#   names       NAME per entry, one run per category sorted by the UTF-8 bytes of SEARCH, for binary searching
+#   categories  CATEGORY per top-level key of wiki.json
+#
+# A node is an entry (anything with SEARCH), or a plain dict grouping entries, such as the hooks of one class.
+# SEARCH, LINK, DESCRIPTION and VALUE get a string each, True keys get a bit, and whatever is left
+# (arguments, returns, notes...) is kept as a compact JSON string in EXTRA, so one entry can be decoded
+# without touching anything else. A node's children are listed after it, and go into its MEMBERS if it
+# has the MEMBERS bit, or straight into the node itself otherwise.
+# Entries that share a SEARCH name are next to each other in names, in node order.
+
+from collections.abc import Mapping
+import json
+import mmap
+import struct
+import sys
+
+BUNDLE_MAGIC = b"GWIK"
+
+# Bump whenever the layout changes
+BUNDLE_VERSION = 2
+
+# magic, version, flag count, string count, node count, name count, category count,
+# flags offset, strings offset, string data offset, nodes offset, names offset, categories offset
+HEADER = struct.Struct("<4sHHIIIIIIIIII")
+
+# parent, key, flags, SEARCH, LINK, DESCRIPTION, VALUE, EXTRA
+NODE = struct.Struct("<IIIIIIII")
+
+# SEARCH, node
+NAME = struct.Struct("<II")
+
+# name, first node, node count, EXTRA, first name, name count
+CATEGORY = struct.Struct("<IIIIII")
+
+NONE = 0xFFFFFFFF
+NODE_STRINGS = ("SEARCH", "LINK", "DESCRIPTION", "VALUE")
+
+# The top bit marks a node with MEMBERS, so only 31 are left for flags
+FLAG_MEMBERS = 1 << 31
+MAX_FLAGS = 31
+
+# Realms always get the lowest bits, like in records.py
+BUNDLE_FLAGS = ["CLIENT", "SERVER", "MENU"]
+
+EXTRA_ENCODER = json.JSONEncoder(separators=(",", ":"), default=lambda record: record.to_dict())
+
+class BundleWriter:
+	def __init__(self):
+		self.STRINGS = {}
+		self.STRING_VALUES = []
+		self.FLAGS = {key: 1 << bit for bit, key in enumerate(BUNDLE_FLAGS)}
+		self.NODES = []
+		self.NAMES = []
+		self.CATEGORIES = []
+
+	def add_string(self, value):
+		if value is None: return NONE
+		index = self.STRINGS.get(value)
+		if index is None:
+			index = self.STRINGS[value] = len(self.STRINGS)
+			self.STRING_VALUES.append(value)
+		return index
+
+	def add_extra(self, extra):
+		return self.add_string(EXTRA_ENCODER.encode(extra)) if len(extra) > 0 else NONE
+
+	def get_flag(self, key):
+		bit = self.FLAGS.get(key)
+		if bit is None:
+			if len(self.FLAGS) == MAX_FLAGS: raise ValueError("Too many flags to bundle, {key} doesn't fit".format(key = key))
+			bit = self.FLAGS[key] = 1 << len(self.FLAGS)
+		return bit
+
+	# Splits a dict's values into child nodes and everything else
+	def add_children(self, parent, obj):
+		extra = {}
+		for key, value in obj.items():
+			if isinstance(value, Mapping):
+				self.add_node(parent, key, value)
+			else:
+				extra[key] = value
+		return extra
+
+	def add_node(self, parent, key, obj):
+		index = len(self.NODES)
+		self.NODES.append(None)
+
+		flags = 0
+		strings = dict.fromkeys(NODE_STRINGS, NONE)
+		extra = {}
+
+		if "SEARCH" not in obj and "MEMBERS" not in obj:
+			extra = self.add_children(index, obj)
+		else:
+			for field, value in obj.items():
+				if field == "MEMBERS" and isinstance(value, Mapping):
+					flags |= FLAG_MEMBERS
+				elif field in strings and type(value) is str:
+					strings[field] = self.add_string(value)
+				elif value is True:
+					flags |= self.get_flag(field)
+				else:
+					extra[field] = value
+
+			if flags & FLAG_MEMBERS:
+				members_extra = self.add_children(index, obj["MEMBERS"])
+				if len(members_extra) > 0: raise ValueError("Can't bundle {key}, its MEMBERS aren't all dicts".format(key = key))
+
+		self.NODES[index] = (parent, self.add_string(key), flags, strings["SEARCH"], strings["LINK"], strings["DESCRIPTION"], strings["VALUE"], self.add_extra(extra))
+
+	def add_category(self, name, entries):
+		first = len(self.NODES)
+		extra = self.add_children(NONE, entries)
+
+		# sorted() is stable, so entries with the same name stay in node order
+		first_name = len(self.NAMES)
+		names = [(search, index) for index, search in enumerate((node[3] for node in self.NODES[first:]), first) if search != NONE]
+		self.NAMES.extend(sorted(names, key=self.get_name_key))
+
+		self.CATEGORIES.append((self.add_string(name), first, len(self.NODES) - first, self.add_extra(extra), first_name, len(self.NAMES) - first_name))
+
+	def get_name_key(self, name):
+		return self.STRING_VALUES[name[0]].encode("utf-8")
+
+	def write(self, path):
+		flags = [self.add_string(key) for key in self.FLAGS]
+
+		string_offsets = [0]
+		string_data = bytearray()
+		for value in self.STRINGS:
+			string_data += value.encode("utf-8")
+			string_offsets.append(len(string_data))
+
+		flags_offset = HEADER.size
+		strings_offset = flags_offset + 4 * len(flags)
+		string_data_offset = strings_offset + 4 * len(string_offsets)
+		# Keep the tables 4-byte aligned
+		nodes_offset = string_data_offset + len(string_data) + (-len(string_data)) % 4
+		names_offset = nodes_offset + NODE.size * len(self.NODES)
+		categories_offset = names_offset + NAME.size * len(self.NAMES)
+
+		f = open(path, "wb")
+		f.write(HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(flags), len(self.STRINGS), len(self.NODES), len(self.NAMES), len(self.CATEGORIES), flags_offset, strings_offset, string_data_offset, nodes_offset, names_offset, categories_offset))
+		f.write(struct.pack("<" + str(len(flags)) + "I", *flags))
+		f.write(struct.pack("<" + str(len(string_offsets)) + "I", *string_offsets))
+		f.write(string_data)
+		f.write(bytes((-len(string_data)) % 4))
+		for node in self.NODES: f.write(NODE.pack(*node))
+		for name in self.NAMES: f.write(NAME.pack(*name))
+		for category in self.CATEGORIES: f.write(CATEGORY.pack(*category))
+		f.close()
+
+def write_bundle(wiki_scrape, path):
+	writer = BundleWriter()
+	for name, entries in wiki_scrape.items():
+		writer.add_category(name, entries)
+	writer.write(path)
+
+# Decodes strings and nodes straight out of the mapped file as they're asked for
+class Bundle:
+	def __init__(self, path):
+		self.FILE = open(path, "rb")
+		self.DATA = mmap.mmap(self.FILE.fileno(), 0, access=mmap.ACCESS_READ)
+
+		magic, version, flag_count, self.STRING_COUNT, self.NODE_COUNT, self.NAME_COUNT, category_count, flags_offset, self.STRINGS_OFFSET, self.STRING_DATA_OFFSET, self.NODES_OFFSET, self.NAMES_OFFSET, categories_offset = HEADER.unpack_from(self.DATA, 0)
+		if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+			raise ValueError("{path} isn't a version {version} wiki bundle".format(path = path, version = BUNDLE_VERSION))
+
+		self.FLAGS = [(self.get_string(index), 1 << bit) for bit, index in enumerate(struct.unpack_from("<" + str(flag_count) + "I", self.DATA, flags_offset))]
+
+		self.CATEGORIES = {}
+		for i in range(category_count):
+			name, first, count, extra, first_name, name_count = CATEGORY.unpack_from(self.DATA, categories_offset + i * CATEGORY.size)
+			self.CATEGORIES[self.get_string(name)] = (first, count, extra, first_name, name_count)
+
+	def close(self):
+		self.DATA.close()
+		self.FILE.close()
+
+	def get_string_bytes(self, index):
+		start, end = struct.unpack_from("<II", self.DATA, self.STRINGS_OFFSET + 4 * index)
+		return self.DATA[self.STRING_DATA_OFFSET + start:self.STRING_DATA_OFFSET + end]
+
+	def get_string(self, index):
+		if index == NONE: return None
+		return self.get_string_bytes(index).decode("utf-8")
+
+	def get_extra(self, index):
+		return {} if index == NONE else json.loads(self.get_string(index))
+
+	def get_node(self, index):
+		return NODE.unpack_from(self.DATA, self.NODES_OFFSET + index * NODE.size)
+
+	# The node's own keys, without any of its children
+	def entry(self, index):
+		parent, key, flags, *strings, extra = self.get_node(index)
+
+		obj = {}
+		for field, string in zip(NODE_STRINGS, strings):
+			if string != NONE: obj[field] = self.get_string(string)
+		for field, bit in self.FLAGS:
+			if flags & bit: obj[field] = True
+		obj.update(self.get_extra(extra))
+		if flags & FLAG_MEMBERS: obj["MEMBERS"] = {}
+		return obj
+
+	def get_key(self, index):
+		return self.get_string(self.get_node(index)[1])
+
+	def category(self, name):
+		first, count = self.CATEGORIES[name][:2]
+		return range(first, first + count)
+
+	def get_name(self, index):
+		return NAME.unpack_from(self.DATA, self.NAMES_OFFSET + index * NAME.size)
+
+	# Every node of the category with this SEARCH name, by binary search over its names, without decoding any strings
+	def find(self, category, search):
+		first_name, name_count = self.CATEGORIES[category][3:]
+		search = search.encode("utf-8")
+
+		low, high = first_name, first_name + name_count
+		while low < high:
+			middle = (low + high) // 2
+			if self.get_string_bytes(self.get_name(middle)[0]) < search:
+				low = middle + 1
+			else:
+				high = middle
+
+		found = []
+		while low < first_name + name_count:
+			string, node = self.get_name(low)
+			if self.get_string_bytes(string) != search: break
+			found.append(node)
+			low += 1
+		return found
+
+	def to_json(self):
+		wiki_scrape = {}
+		for name, (first, count, extra, first_name, name_count) in self.CATEGORIES.items():
+			entries = wiki_scrape[name] = self.get_extra(extra)
+
+			# Children always come after their parent, so every parent is around by the time they turn up
+			children = {NONE: entries}
+			for index in range(first, first + count):
+				parent, key, flags = self.get_node(index)[:3]
+				obj = self.entry(index)
+				children[index] = obj["MEMBERS"] if flags & FLAG_MEMBERS else obj
+				children[parent][self.get_string(key)] = obj
+
+		return wiki_scrape
+
+def main():
+	json_path = sys.argv[1] if len(sys.argv) > 1 else "../resources/wiki.json"
+	bundle_path = sys.argv[2] if len(sys.argv) > 2 else "../resources/wiki.bundle"
+
+	f = open(json_path, "r", encoding="utf-8")
+	wiki_scrape = json.loads(f.read())
+	f.close()
+
+	write_bundle(wiki_scrape, bundle_path)
+	bundle = Bundle(bundle_path)
+	try:
+		print("{nodes} nodes, {strings} strings, {size} bytes".format(nodes = bundle.NODE_COUNT, strings = bundle.STRING_COUNT, size = len(bundle.DATA)))
+		if bundle.to_json() != wiki_scrape:
+			print("Round trip FAILED, " + bundle_path + " doesn't decode to " + json_path)
+			sys.exit(1)
+	finally:
+		bundle.close()
+	print("Round trip OK")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,251 @@
+# Wiki page cache
+#
+#   python cache.py import [DIRECTORY]   copies the scrape/<md5>.<ext> files of the old cache into scrape/pages.db
+#   python cache.py compact              drops the free pages left behind by evictions and rewrites the pack
+#   python cache.py stats
+#
+# PackedPageCache, the one the scraper uses, keeps every page zlib-compressed in a single SQLite database,
+# keyed by the same <md5 of the URL>.<ext> as the files of PageCache, which is only kept around to import them.
+# A full cached run then reads one file instead of thousands, and scrape/ can be copied between machines in one go
+
+import hashlib
+import json
+import os, os.path
+import re
+import sqlite3
+import sys
+import threading
+import zlib
+
+def get_key(url, extension):
+	return hashlib.md5(url.encode()).hexdigest() + "." + extension
+
+# Old cache, stored as scrape/<md5>.<ext> files with a .meta sidecar holding freshness metadata
+class PageCache:
+	REGEX_CACHE_FILE = re.compile(r"^([0-9a-f]{32}\.(?:html|xml))(?:\.meta)?$")
+
+	def __init__(self, directory="scrape"):
+		self.DIRECTORY = directory
+		self.USED = set()
+
+	def get_key(self, url, extension):
+		return get_key(url, extension)
+
+	def get_path(self, key):
+		return os.path.join(self.DIRECTORY, key)
+
+	def load(self, url, extension):
+		key = self.get_key(url, extension)
+		body = self.load_key(key)
+		if body is None:
+			return None, None
+
+		self.USED.add(key)
+		return body, self.load_meta(key)
+
+	def load_key(self, key):
+		path = self.get_path(key)
+		if not os.path.exists(path):
+			return None
+
+		f = open(path, "r", encoding="utf-8")
+		body = f.read()
+		f.close()
+
+		return body
+
+	def load_meta(self, key):
+		path = self.get_path(key) + ".meta"
+		if not os.path.exists(path):
+			return None
+
+		f = open(path, "r", encoding="utf-8")
+		meta = json.loads(f.read())
+		f.close()
+
+		return meta
+
+	def store(self, url, extension, body, meta):
+		key = self.get_key(url, extension)
+		self.USED.add(key)
+
+		f = open(self.get_path(key), "w", encoding="utf-8", newline="\n")
+		f.write(body)
+		f.close()
+
+		self.store_meta(key, meta)
+
+	def store_meta(self, key, meta):
+		f = open(self.get_path(key) + ".meta", "w", encoding="utf-8", newline="\n")
+		f.write(json.dumps(meta))
+		f.close()
+
+	def touch(self, url, extension, meta):
+		key = self.get_key(url, extension)
+		self.USED.add(key)
+		self.store_meta(key, meta)
+
+	def mark_used(self, url, extension):
+		self.USED.add(self.get_key(url, extension))
+
+	def keys(self):
+		if not os.path.isdir(self.DIRECTORY): return []
+		return sorted(file_name for file_name in os.listdir(self.DIRECTORY) if self.REGEX_CACHE_FILE.match(file_name) and not file_name.endswith(".meta"))
+
+	# Deletes every cached page that wasn't loaded or stored during this run
+	def evict(self):
+		evicted = set()
+		for file_name in os.listdir(self.DIRECTORY):
+			match = self.REGEX_CACHE_FILE.match(file_name)
+			if match and match.group(1) not in self.USED:
+				os.remove(self.get_path(file_name))
+				evicted.add(match.group(1))
+		return len(evicted)
+
+# Same interface as PageCache, but everything lives in one database, opened on first use
+# so that merely importing the scraper (as parse worker processes do) never touches it
+class PackedPageCache:
+	COMPRESSION_LEVEL = 6
+
+	def __init__(self, path="scrape/pages.db"):
+		self.PATH = path
+		self.CONNECTION = None
+		self.PRELOADED = None
+		self.USED = set()
+		# --jobs fetches pages on several threads, and they all share the one connection
+		self.LOCK = threading.RLock()
+
+	def get_key(self, url, extension):
+		return get_key(url, extension)
+
+	def connect(self):
+		if self.CONNECTION is None:
+			if os.path.dirname(self.PATH): os.makedirs(os.path.dirname(self.PATH), exist_ok=True)
+			self.CONNECTION = sqlite3.connect(self.PATH, check_same_thread=False)
+			# Every store is committed on its own so --resume never loses a fetched page,
+			# WAL keeps that from syncing to disk each time
+			self.CONNECTION.execute("PRAGMA journal_mode=WAL")
+			self.CONNECTION.execute("PRAGMA synchronous=NORMAL")
+			self.CONNECTION.execute("CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, url TEXT, body BLOB NOT NULL, meta TEXT)")
+		return self.CONNECTION
+
+	def close(self):
+		with self.LOCK:
+			if self.CONNECTION is not None:
+				self.CONNECTION.close()
+				self.CONNECTION = None
+			self.PRELOADED = None
+
+	# Drops the preloaded pages once they've all been read, anything loaded after that comes from the database again
+	def unload(self):
+		with self.LOCK:
+			self.PRELOADED = None
+
+	# Reads the whole pack into memory in one query, pages are only decompressed once they're loaded
+	def preload(self):
+		with self.LOCK:
+			self.PRELOADED = {key: (body, meta) for key, body, meta in self.connect().execute("SELECT key, body, meta FROM pages")}
+			return len(self.PRELOADED)
+
+	def load(self, url, extension):
+		key = self.get_key(url, extension)
+		with self.LOCK:
+			if self.PRELOADED is not None:
+				row = self.PRELOADED.get(key)
+			else:
+				row = self.connect().execute("SELECT body, meta FROM pages WHERE key = ?", (key,)).fetchone()
+			if row is None:
+				return None, None
+			self.USED.add(key)
+
+		body, meta = row
+		return zlib.decompress(body).decode("utf-8"), meta and json.loads(meta)
+
+	def store(self, url, extension, body, meta):
+		self.store_key(self.get_key(url, extension), url, body, meta)
+
+	def store_key(self, key, url, body, meta):
+		row = (zlib.compress(body.encode("utf-8"), self.COMPRESSION_LEVEL), meta and json.dumps(meta))
+		with self.LOCK:
+			self.USED.add(key)
+			connection = self.connect()
+			connection.execute("INSERT OR REPLACE INTO pages (key, url, body, meta) VALUES (?, ?, ?, ?)", (key, url) + row)
+			connection.commit()
+			if self.PRELOADED is not None: self.PRELOADED[key] = row
+
+	def touch(self, url, extension, meta):
+		key = self.get_key(url, extension)
+		meta = json.dumps(meta)
+		with self.LOCK:
+			self.USED.add(key)
+			connection = self.connect()
+			connection.execute("UPDATE pages SET meta = ? WHERE key = ?", (meta, key))
+			connection.commit()
+			if self.PRELOADED is not None and key in self.PRELOADED:
+				self.PRELOADED[key] = (self.PRELOADED[key][0], meta)
+
+	# Keeps a page that wasn't loaded this run from being evicted
+	def mark_used(self, url, extension):
+		with self.LOCK:
+			self.USED.add(self.get_key(url, extension))
+
+	def keys(self):
+		with self.LOCK:
+			return [key for key, in self.connect().execute("SELECT key FROM pages ORDER BY key")]
+
+	# Deletes every cached page that wasn't loaded or stored during this run
+	def evict(self):
+		with self.LOCK:
+			evicted = [key for key in self.keys() if key not in self.USED]
+			connection = self.connect()
+			connection.executemany("DELETE FROM pages WHERE key = ?", [(key,) for key in evicted])
+			connection.commit()
+			if self.PRELOADED is not None:
+				for key in evicted: self.PRELOADED.pop(key, None)
+			return len(evicted)
+
+	# SQLite never gives back the space of deleted or replaced pages by itself
+	def compact(self):
+		with self.LOCK:
+			connection = self.connect()
+			connection.execute("VACUUM")
+			connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+	# Copies over every page of a PageCache directory that isn't in the pack yet
+	def import_directory(self, directory="scrape"):
+		files = PageCache(directory)
+		existing = set(self.keys())
+		imported = 0
+		for key in files.keys():
+			if key in existing: continue
+			meta = files.load_meta(key)
+			self.store_key(key, meta and meta.get("url"), files.load_key(key), meta)
+			imported += 1
+		return imported
+
+	def get_size(self):
+		size = 0
+		for path in (self.PATH, self.PATH + "-wal"):
+			if os.path.exists(path): size += os.path.getsize(path)
+		return size
+
+def main():
+	cache = PackedPageCache()
+	command = sys.argv[1] if len(sys.argv) > 1 else None
+	if command == "import":
+		directory = sys.argv[2] if len(sys.argv) > 2 else "scrape"
+		print("Imported {count} pages from {directory}/ into {path}".format(count = cache.import_directory(directory), directory = directory, path = cache.PATH))
+		print("The old files can be deleted once you've checked a --cached run works")
+	elif command == "compact":
+		size = cache.get_size()
+		cache.compact()
+		print("Compacted {path} from {size} to {compacted} bytes".format(path = cache.PATH, size = size, compacted = cache.get_size()))
+	elif command == "stats":
+		print("{count} pages, {size} bytes".format(count = len(cache.keys()), size = cache.get_size()))
+	else:
+		print("usage: python cache.py import [DIRECTORY] | compact | stats")
+		sys.exit(1)
+	cache.close()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,97 @@
+# Callback parameters, read out of the rendered description of a function-typed argument
+#
+#   python callbacks.py
+#
+# checks the parser against the examples below
+#
+# The wiki lists them one per line, as a link to the parameter's type followed by its name and a description:
+#
+#   * [number](/gmod/number) index - The index
+#   - [Entity](/gmod/Entity) ent
+#   1. [Enums/TEXT_ALIGN](/gmod/Enums/TEXT_ALIGN) align - How to align it,
+#      continued on an indented line
+#   Arguments: [string](/gmod/string) name
+#
+# A link at the start of a line without a bullet only counts when a name follows it, since it's usually just prose
+
+import re
+import sys
+
+REGEX_BULLET = re.compile(r"\s*(?:[*+-]|\d+[.)])\s+")
+REGEX_PARAM = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)(?:\s+(.*?))?\s*$")
+REGEX_INLINE_PARAM = re.compile(r":\s+\[([^\]]+)\]\(([^)\s]+)\)(?:\s+(.*?))?\s*$")
+
+ENUM_LINK = "/gmod/Enums/"
+
+def get_param_def(match):
+	param_def = {}
+	param_def["TYPE"] = match.group(1)
+	param_def["TYPE_LINK"] = match.group(2)
+	if param_def["TYPE_LINK"].startswith(ENUM_LINK):
+		param_def["ENUM"] = param_def["TYPE_LINK"][len(ENUM_LINK):]
+
+	name, _, description = (match.group(3) or "").partition(" - ")
+	name = name.strip().strip("`*")
+	if name: param_def["NAME"] = name
+	if description.strip(): param_def["DESCRIPTION"] = description.strip()
+	return param_def
+
+def parse_callback_params(description):
+	params = []
+	param_def = None
+	for line in description.split("\n"):
+		bullet = REGEX_BULLET.match(line)
+		if bullet:
+			match = REGEX_PARAM.match(line, bullet.end())
+		else:
+			match = REGEX_PARAM.match(line) or REGEX_INLINE_PARAM.search(line)
+			if match and not match.group(3): match = None
+
+		if match:
+			param_def = get_param_def(match)
+			params.append(param_def)
+		elif param_def is not None and line[:1].isspace() and line.strip():
+			# Indented lines carry on the description of the parameter above
+			if "DESCRIPTION" in param_def:
+				param_def["DESCRIPTION"] += " " + line.strip()
+			else:
+				param_def["DESCRIPTION"] = line.strip()
+		else:
+			param_def = None
+
+	return params
+
+EXAMPLES = [
+	(
+		"Called with\n* [number](/gmod/number) index - The index\n* [string](/gmod/string) name - some name - really",
+		[{"TYPE": "number", "TYPE_LINK": "/gmod/number", "NAME": "index", "DESCRIPTION": "The index"}, {"TYPE": "string", "TYPE_LINK": "/gmod/string", "NAME": "name", "DESCRIPTION": "some name - really"}],
+	),
+	(
+		"- [Entity](/gmod/Entity) `ent`\n1. [TEXT_ALIGN](/gmod/Enums/TEXT_ALIGN) align - How to align it,\n   continued here\nNot a parameter",
+		[{"TYPE": "Entity", "TYPE_LINK": "/gmod/Entity", "NAME": "ent"}, {"TYPE": "TEXT_ALIGN", "TYPE_LINK": "/gmod/Enums/TEXT_ALIGN", "ENUM": "TEXT_ALIGN", "NAME": "align", "DESCRIPTION": "How to align it, continued here"}],
+	),
+	(
+		"Function argument(s): [Player](/gmod/Player) ply\n[Vector](/gmod/Vector) pos - Where",
+		[{"TYPE": "Player", "TYPE_LINK": "/gmod/Player", "NAME": "ply"}, {"TYPE": "Vector", "TYPE_LINK": "/gmod/Vector", "NAME": "pos", "DESCRIPTION": "Where"}],
+	),
+	(
+		"The [Entity](/gmod/Entity) to use\n[Entity](/gmod/Entity)\n* [table](/gmod/table)",
+		[{"TYPE": "table", "TYPE_LINK": "/gmod/table"}],
+	),
+]
+
+def main():
+	failed = 0
+	for description, expected in EXAMPLES:
+		params = parse_callback_params(description)
+		if params != expected:
+			failed += 1
+			print("FAILED " + repr(description))
+			print("  expected " + repr(expected))
+			print("  got      " + repr(params))
+
+	print("{passed}/{count} examples passed".format(passed = len(EXAMPLES) - failed, count = len(EXAMPLES)))
+	if failed > 0: sys.exit(1)
+
+if __name__ == "__main__":
+	main()
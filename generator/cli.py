@@ -0,0 +1,10 @@
+# Command line helpers shared by main.py and the tools that can also be run on their own
+
+import sys
+
+def get_arg_value(name, default=None):
+	if name in sys.argv:
+		index = sys.argv.index(name)
+		if index + 1 < len(sys.argv):
+			return sys.argv[index + 1]
+	return default
@@ -0,0 +1,187 @@
+# Structural diff between two generations of wiki.json, written by main.py next to wiki.json as wiki.delta.json
+#
+#   python delta.py diff <old wiki.json> <new wiki.json> [delta.json]
+#   python delta.py apply <old wiki.json or wiki.bundle> <delta.json> [output]
+#
+# diff writes the delta (default wiki.delta.json) and checks that applying it to the old file gives the new one.
+# apply writes the patched file in the format of the one it was given (default: over it)
+#
+# Every dict in wiki.json is a node, addressed by its key path,
+# e.g. ["CLASSES", "Entity", "MEMBERS", "GetPos"]. An entry's fields are all its keys but MEMBERS, whose
+# members are nodes of their own (an entry with members gets "MEMBERS": {} in its fields to say so), and
+# any other dict's fields are its non-dict values.
+#
+# VERSION  bumped whenever the layout changes
+# FROM     get_digest() of the wiki.json the delta applies to
+# TO       get_digest() of the wiki.json it turns it into
+# REMOVED  [{"PATH", "SEARCH", "LINK"}, ...] nodes that are gone, along with everything under them
+# ADDED    [{"PATH", "FIELDS"}, ...] new nodes, parents always before their members
+# CHANGED  [{"PATH", "SEARCH", "LINK", "FIELDS": {changed or new fields}, "DELETED": [fields]}, ...]
+# SEARCH and LINK are only there for entries, so the extension can patch its lookups without reading the fields
+
+from collections.abc import Mapping
+import hashlib
+import json
+import os.path
+import sys
+
+from output import ENCODER, write_json
+
+DELTA_VERSION = 1
+
+DIGEST_ENCODER = json.JSONEncoder(separators=(",", ":"), sort_keys=True, default=lambda record: record.to_dict())
+
+# Doesn't depend on key order, so records and wiki.json read back in give the same digest
+def get_digest(wiki_scrape):
+	return hashlib.md5(DIGEST_ENCODER.encode(wiki_scrape).encode()).hexdigest()
+
+# Key path -> fields of every node, in document order
+def flatten(wiki_scrape):
+	nodes = {}
+	def step(into, path):
+		for key, value in into.items():
+			if not isinstance(value, Mapping): continue
+			node_path = path + (key,)
+
+			if "SEARCH" in value:
+				fields = {field: field_value for field, field_value in value.items() if field != "MEMBERS" or not isinstance(field_value, Mapping)}
+				nodes[node_path] = fields
+				if isinstance(value.get("MEMBERS"), Mapping):
+					fields["MEMBERS"] = {}
+					step(value["MEMBERS"], node_path + ("MEMBERS",))
+			else:
+				nodes[node_path] = {field: field_value for field, field_value in value.items() if not isinstance(field_value, Mapping)}
+				step(value, node_path)
+	step(wiki_scrape, ())
+	return nodes
+
+def add_names(change, fields):
+	for field in ("SEARCH", "LINK"):
+		if field in fields: change[field] = fields[field]
+	return change
+
+def diff(old, new):
+	old_nodes = flatten(old)
+	new_nodes = flatten(new)
+
+	removed = [add_names({"PATH": list(path)}, fields) for path, fields in old_nodes.items() if path not in new_nodes]
+	added = []
+	changed = []
+	for path, fields in new_nodes.items():
+		old_fields = old_nodes.get(path)
+		if old_fields is None:
+			added.append({"PATH": list(path), "FIELDS": fields})
+			continue
+
+		changed_fields = {field: value for field, value in fields.items() if field not in old_fields or old_fields[field] != value}
+		deleted_fields = [field for field in old_fields if field not in fields]
+		if len(changed_fields) > 0 or len(deleted_fields) > 0:
+			changed.append(add_names({"PATH": list(path), "FIELDS": changed_fields, "DELETED": deleted_fields}, fields))
+
+	return {
+		"VERSION": DELTA_VERSION,
+		"FROM": get_digest(old),
+		"TO": get_digest(new),
+		"REMOVED": removed,
+		"ADDED": added,
+		"CHANGED": changed,
+	}
+
+def is_empty(delta):
+	return len(delta["REMOVED"]) == 0 and len(delta["ADDED"]) == 0 and len(delta["CHANGED"]) == 0
+
+def get_node(wiki_scrape, path):
+	node = wiki_scrape
+	for key in path:
+		node = node[key]
+	return node
+
+class DeltaError(Exception):
+	pass
+
+# Patches an older wiki.json in place, which has to be the exact one the delta was made from unless check is off
+def apply(wiki_scrape, delta, check=True):
+	if delta["VERSION"] != DELTA_VERSION:
+		raise DeltaError("Can't apply a version {version} delta, only version {supported}".format(version = delta["VERSION"], supported = DELTA_VERSION))
+	if check and get_digest(wiki_scrape) != delta["FROM"]:
+		raise DeltaError("The delta wasn't made from this wiki.json")
+
+	# Members first, in case their parent goes too
+	for change in reversed(delta["REMOVED"]):
+		*path, key = change["PATH"]
+		try:
+			del get_node(wiki_scrape, path)[key]
+		except KeyError:
+			pass
+
+	for change in delta["CHANGED"]:
+		node = get_node(wiki_scrape, change["PATH"])
+		for field in change["DELETED"]:
+			del node[field]
+		for field, value in change["FIELDS"].items():
+			# A MEMBERS dict only says there are members, they come as nodes of their own
+			if field == "MEMBERS" and isinstance(value, Mapping) and isinstance(node.get("MEMBERS"), Mapping): continue
+			node[field] = {} if field == "MEMBERS" and isinstance(value, Mapping) else value
+
+	# Changes go before additions, since an entry can gain members
+	for change in delta["ADDED"]:
+		*path, key = change["PATH"]
+		get_node(wiki_scrape, path)[key] = {field: {} if field == "MEMBERS" and isinstance(value, Mapping) else value for field, value in change["FIELDS"].items()}
+
+	if check and get_digest(wiki_scrape) != delta["TO"]:
+		raise DeltaError("Applying the delta didn't give the wiki.json it was made for")
+	return wiki_scrape
+
+def get_summary(delta):
+	return "{added} added, {removed} removed, {changed} changed".format(added = len(delta["ADDED"]), removed = len(delta["REMOVED"]), changed = len(delta["CHANGED"]))
+
+def read_json(path):
+	f = open(path, "r", encoding="utf-8")
+	obj = json.loads(f.read())
+	f.close()
+	return obj
+
+# Writes the delta from the wiki.json at old_path (usually the previous scrape/scrape.json) to wiki_scrape,
+# or nothing when there's no previous generation to diff against
+def write_delta(wiki_scrape, old_path, paths):
+	if not os.path.exists(old_path): return None
+	delta = diff(read_json(old_path), wiki_scrape)
+	write_json(delta, paths)
+	return delta
+
+def main():
+	if len(sys.argv) > 3 and sys.argv[1] == "diff":
+		old = read_json(sys.argv[2])
+		new = read_json(sys.argv[3])
+		delta_path = sys.argv[4] if len(sys.argv) > 4 else "wiki.delta.json"
+
+		delta = diff(old, new)
+		write_json(delta, [delta_path])
+		print(get_summary(delta) + ", " + str(len(ENCODER.encode(delta))) + " bytes")
+
+		if apply(old, read_json(delta_path)) != new:
+			print("FAILED, applying " + delta_path + " doesn't give " + sys.argv[3])
+			sys.exit(1)
+		print("OK")
+	elif len(sys.argv) > 3 and sys.argv[1] == "apply":
+		path = sys.argv[2]
+		output_path = sys.argv[4] if len(sys.argv) > 4 else path
+		delta = read_json(sys.argv[3])
+
+		if path.endswith(".bundle"):
+			from bundle import Bundle, write_bundle
+			bundle = Bundle(path)
+			try:
+				wiki_scrape = bundle.to_json()
+			finally:
+				bundle.close()
+			write_bundle(apply(wiki_scrape, delta), output_path)
+		else:
+			write_json(apply(read_json(path), delta), [output_path])
+		print("Applied " + get_summary(delta) + " to " + output_path)
+	else:
+		print("usage: python delta.py diff <old wiki.json> <new wiki.json> [delta.json] | apply <old wiki.json or wiki.bundle> <delta.json> [output]")
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
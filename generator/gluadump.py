@@ -1,58 +1,143 @@
 # kind of horrible
 
 import json
+import os, os.path
+import pickle
 
-def gluadump(wiki_scrape):
-	f = open("gluadump.json", "r", encoding="utf-8", errors="replace") # https://github.com/WilliamVenner/gluadump
-	gluadump = json.loads(f.read())
-	f.close()
+from profiler import profiler
+
+GLUADUMP_PATH = "gluadump.json" # https://github.com/WilliamVenner/gluadump
+GLUADUMP_CACHE_PATH = "scrape/gluadump.pickle"
 
-	# Resolves cyclic references by changing them to actual references
-	# We obviously can't do this in JSON but we can in Python
-	def find_cyclic(dump, cyclics={}, id_base=""):
-		if type(dump) is list and not dump: return
+# Bump whenever resolve_cyclic changes, so stale cached dumps aren't reused
+GLUADUMP_CACHE_VERSION = 1
+
+# Resolves cyclic references by changing them to actual references
+# We obviously can't do this in JSON but we can in Python
+def resolve_cyclic(dump):
+	entries = {}
+	def find_entries(dump, id_base=""):
+		if type(dump) is list: return
 		for name, entry in dump.items():
 			id = id_base + name
-			if "cyclic" in entry:
-				for realm, cyclic in entry["cyclic"].items():
-					if cyclic not in cyclics:
-						cyclics[cyclic] = {}
-					if realm not in cyclics[cyclic]:
-						cyclics[cyclic][realm] = []
-					if id not in cyclics[cyclic][realm]:
-						cyclics[cyclic][realm].append(entry)
+			entries[id] = entry
 			if "members" in entry:
-				find_cyclic(entry["members"], cyclics, id + ".")
-		return cyclics
-	
-	def resolve_cyclic(cyclics, dump, id_base=""):
-		if type(dump) is list and not dump: return
-		for name, entry in dump.items():
-			id = id_base + name
+				find_entries(entry["members"], id + ".")
+	find_entries(dump)
 
-			if id in cyclics:
-				for realm, cyclic_entries in cyclics[id].items():
-					for cyclic_entry in cyclic_entries:
-						if not "members" in cyclic_entry:
-							cyclic_entry["members"] = {}
-						cyclic_entry["members"] = cyclic_entry["members"] | entry["members"]
-						del cyclic_entry["cyclic"]
+	resolving = set()
+	def resolve(entry):
+		if "cyclic" not in entry or id(entry) in resolving: return
+		resolving.add(id(entry))
 
-			if "members" in entry:
-				resolve_cyclic(cyclics, entry["members"], id + ".")
+		for realm, cyclic in entry["cyclic"].items():
+			cyclic_entry = entries.get(cyclic)
+			if cyclic_entry is None: continue
 
-	resolve_cyclic(find_cyclic(gluadump), gluadump)
+			# Make sure whatever we're pointing at has its own cyclic references resolved first
+			resolve(cyclic_entry)
+
+			if cyclic_entry.get("members"):
+				if not entry.get("members"):
+					entry["members"] = {}
+				entry["members"].update(cyclic_entry["members"])
+
+		del entry["cyclic"]
+		resolving.discard(id(entry))
+
+	for entry in list(entries.values()):
+		resolve(entry)
+
+	return dump
+
+def load_gluadump(path=GLUADUMP_PATH, cache_path=GLUADUMP_CACHE_PATH):
+	# The resolved dump is cached as a pickle, which keeps the references resolve_cyclic made,
+	# and is reused for as long as gluadump.json hasn't changed
+	stat = os.stat(path)
+	stamp = [GLUADUMP_CACHE_VERSION, stat.st_size, stat.st_mtime_ns]
+
+	if cache_path is not None and os.path.exists(cache_path):
+		f = open(cache_path, "rb")
+		cached_stamp, dump = pickle.load(f)
+		f.close()
+
+		if cached_stamp == stamp:
+			return dump
+
+	f = open(path, "r", encoding="utf-8", errors="replace")
+	dump = resolve_cyclic(json.load(f))
+	f.close()
+
+	if cache_path is not None:
+		f = open(cache_path, "wb")
+		pickle.dump((stamp, dump), f, pickle.HIGHEST_PROTOCOL)
+		f.close()
+
+	return dump
+
+def format_src(src):
+	return [src[0], str(int(src[1])) + "-" + str(int(src[2]))]
+
+# Indexes every wiki entry by the path of names it would have in the dump
+def index_wiki(wiki_scrape):
+	index = {}
+	def step(wiki, path):
+		for name, wiki_entry in wiki.items():
+			qualified = path + (name,)
+			index.setdefault(qualified, []).append(wiki_entry)
+			if "MEMBERS" in wiki_entry:
+				step(wiki_entry["MEMBERS"], qualified)
 
-	def inject_src(dump, wiki):
-		for name, entry in dump.items():
-			if name in wiki:
-				if ("FUNCTION" in wiki[name] or "METHOD" in wiki[name]) and "src" in entry:
-					for realm, src in entry["src"].items():
-						wiki[name]["SRC"] = [src[0], str(int(src[1])) + "-" + str(int(src[2]))]
-						break
-				if "members" in entry and "MEMBERS" in wiki[name]:
-					inject_src(entry["members"], wiki[name]["MEMBERS"])
-	
 	for key in ["PANELS", "GLOBALS", "LIBRARIES"]:
-		inject_src(gluadump, wiki_scrape[key])
-	inject_src(gluadump["metatables"], wiki_scrape["CLASSES"])
\ No newline at end of file
+		step(wiki_scrape[key], ())
+	step(wiki_scrape["CLASSES"], ("metatables",))
+
+	return index
+
+def inject_src(dump, wiki_scrape):
+	index = index_wiki(wiki_scrape)
+	summary = {"MATCHED": 0, "MISSED": 0, "UNDOCUMENTED": 0}
+	# Wiki functions the dump was looked up for, whether or not they already had a SRC from the wiki
+	found = set()
+
+	def step(dump, path):
+		if type(dump) is list: return
+		for name, entry in dump.items():
+			qualified = path + (name,)
+			wiki_entries = index.get(qualified, [])
+
+			if "src" in entry and entry["src"]:
+				functions = [wiki_entry for wiki_entry in wiki_entries if "FUNCTION" in wiki_entry or "METHOD" in wiki_entry]
+				if len(functions) > 0:
+					summary["MATCHED"] += 1
+				else:
+					summary["UNDOCUMENTED"] += 1
+
+				srcs = {realm.upper(): format_src(src) for realm, src in entry["src"].items()}
+				for wiki_entry in functions:
+					found.add(id(wiki_entry))
+					wiki_entry["SRC"] = next(iter(srcs.values()))
+					if any(src != wiki_entry["SRC"] for src in srcs.values()):
+						wiki_entry["SRC_REALMS"] = srcs
+
+			# Only follow members the wiki has too, cyclic references can make the dump infinitely deep
+			if "members" in entry and any("MEMBERS" in wiki_entry for wiki_entry in wiki_entries):
+				step(entry["members"], qualified)
+
+	step({name: entry for name, entry in dump.items() if name != "metatables"}, ())
+	step(dump.get("metatables", {}), ("metatables",))
+
+	# Wiki functions the dump had nothing for
+	for wiki_entries in index.values():
+		for wiki_entry in wiki_entries:
+			if "FUNCTION" in wiki_entry and id(wiki_entry) not in found:
+				summary["MISSED"] += 1
+
+	return summary
+
+def gluadump(wiki_scrape):
+	with profiler.stage("gluadump_resolve"):
+		dump = load_gluadump()
+	with profiler.stage("inject"):
+		summary = inject_src(dump, wiki_scrape)
+	print("Injected source for {MATCHED} functions ({UNDOCUMENTED} undocumented in the dump, {MISSED} wiki functions without source)".format(**summary))
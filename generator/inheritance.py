@@ -0,0 +1,170 @@
+# Panel and class inheritance, resolved once after scraping so lookups never have to walk PARENT chains
+#
+#   python inheritance.py
+#
+# checks the resolver against the examples below
+#
+# Panels name their parent in PARENT, which is either another panel or a class (Panel itself is a class).
+# Every entry with a parent that exists gets
+#   INHERITS   key paths of its ancestors, nearest first, e.g. [["PANELS", "EditablePanel"], ["CLASSES", "Panel"]]
+#   INHERITED  member name -> index into INHERITS of the nearest ancestor that has it, only for the members that don't
+#              come from the last ancestor, and only when there are any
+# so looking up a member is its own MEMBERS, then INHERITED, then the MEMBERS of the last ancestor in INHERITS,
+# without walking the ancestors in between. The last one is Panel for nearly every panel, and listing all of Panel's
+# members again for every panel would take up more of wiki.json than the panels themselves.
+# A chain stops at a parent that doesn't exist. Entries in a cycle, or inheriting from one, get neither.
+
+import sys
+
+def get_member_names(entry):
+	return entry.get("MEMBERS") or {}
+
+INHERITANCE_CATEGORIES = ("PANELS", "CLASSES")
+
+# Panels come first, a panel's parent is usually another panel. An entry named after its own parent
+# (a panel and the class it wraps) means the other one, if there is another one
+def find_parent(wiki_scrape, node, name):
+	found = None
+	for category in INHERITANCE_CATEGORIES:
+		if name in wiki_scrape[category]:
+			if (category, name) != node: return (category, name)
+			found = node
+	return found
+
+# Every node ends up in exactly one of the cycles, even when several lead into it
+def find_cycles(parents, unresolved):
+	cycles = []
+	seen = set()
+	unresolved_set = set(unresolved)
+	for node in unresolved:
+		path = []
+		while node in unresolved_set and node not in seen:
+			seen.add(node)
+			path.append(node)
+			node = parents[node]
+		if node in path: cycles.append(path[path.index(node):])
+	return cycles
+
+# Adds INHERITS and INHERITED in place, returns the (entry, parent name) of every missing parent and the cycles
+def resolve_inheritance(wiki_scrape, quiet=False):
+	nodes = [(category, name) for category in INHERITANCE_CATEGORIES for name in wiki_scrape[category]]
+
+	parents = {}
+	children = {}
+	missing = []
+	for node in nodes:
+		category, name = node
+		parent_name = wiki_scrape[category][name].get("PARENT")
+		if parent_name is None: continue
+
+		parent = find_parent(wiki_scrape, node, parent_name)
+		if parent is None:
+			missing.append((node, parent_name))
+			continue
+		parents[node] = parent
+		children.setdefault(parent, []).append(node)
+
+	# Topological order, every entry only comes after its parent is done
+	order = [node for node in nodes if node not in parents]
+	for node in order:
+		order.extend(children.get(node, ()))
+
+	chains = {}
+	inherited = {}
+	for node in order:
+		parent = parents.get(node)
+		if parent is None: continue
+
+		category, name = node
+		entry = wiki_scrape[category][name]
+		chains[node] = [list(parent)] + chains.get(parent, [])
+		entry["INHERITS"] = chains[node]
+
+		# Whatever the parent has comes from the last ancestor anyway when the parent is the last ancestor
+		table = {}
+		if parent in parents:
+			table = {member: index + 1 for member, index in inherited[parent].items()}
+			parent_category, parent_name = parent
+			for member in get_member_names(wiki_scrape[parent_category][parent_name]):
+				table[member] = 0
+		own = get_member_names(entry)
+		table = {member: index for member, index in table.items() if member not in own}
+
+		inherited[node] = table
+		if len(table) > 0: entry["INHERITED"] = table
+
+	resolved = set(order)
+	cycles = find_cycles(parents, [node for node in nodes if node not in resolved])
+
+	if not quiet:
+		for (category, name), parent_name in missing:
+			print("Missing parent \"" + parent_name + "\" of " + category + "/" + name)
+		for cycle in cycles:
+			print("Inheritance cycle: " + " -> ".join(category + "/" + name for category, name in cycle + cycle[:1]))
+
+	return missing, cycles
+
+def make_example(panels, classes=None):
+	wiki_scrape = {"PANELS": {}, "CLASSES": {}}
+	for category, entries in (("PANELS", panels), ("CLASSES", classes or {})):
+		for name, (parent, members) in entries.items():
+			entry = {"SEARCH": name, "MEMBERS": {member: {"SEARCH": name + ":" + member} for member in members}}
+			if parent is not None: entry["PARENT"] = parent
+			wiki_scrape[category][name] = entry
+	return wiki_scrape
+
+# (panels, classes, expected INHERITS and INHERITED of each entry, expected missing parents, expected cycles)
+EXAMPLES = [
+	(
+		{
+			"DImageButton": ("DButton", ["SetImage"]),
+			"DButton": ("DLabel", ["DoClick", "SetText"]),
+			"DLabel": ("EditablePanel", ["SetText", "SetFont"]),
+			"EditablePanel": ("Panel", ["SetFocusTopLevel"]),
+		},
+		{"Panel": (None, ["SetText", "Remove"])},
+		{
+			"DImageButton": ([["PANELS", "DButton"], ["PANELS", "DLabel"], ["PANELS", "EditablePanel"], ["CLASSES", "Panel"]], {"DoClick": 0, "SetText": 0, "SetFont": 1, "SetFocusTopLevel": 2}),
+			"DButton": ([["PANELS", "DLabel"], ["PANELS", "EditablePanel"], ["CLASSES", "Panel"]], {"SetFont": 0, "SetFocusTopLevel": 1}),
+			"DLabel": ([["PANELS", "EditablePanel"], ["CLASSES", "Panel"]], {"SetFocusTopLevel": 0}),
+			"EditablePanel": ([["CLASSES", "Panel"]], None),
+			"Panel": (None, None),
+		},
+		[],
+		[],
+	),
+	(
+		{"DOrphan": ("DMissing", ["Think"]), "DChild": ("DOrphan", [])},
+		{},
+		{"DOrphan": (None, None), "DChild": ([["PANELS", "DOrphan"]], None)},
+		[(("PANELS", "DOrphan"), "DMissing")],
+		[],
+	),
+	(
+		{"A": ("B", ["X"]), "B": ("A", []), "C": ("A", []), "D": ("D", []), "Panel": ("Panel", ["Paint"])},
+		{"Panel": (None, ["Remove"])},
+		{"A": (None, None), "B": (None, None), "C": (None, None), "D": (None, None), "Panel": ([["CLASSES", "Panel"]], None)},
+		[],
+		[[("PANELS", "A"), ("PANELS", "B")], [("PANELS", "D")]],
+	),
+]
+
+def main():
+	failed = 0
+	for panels, classes, expected, expected_missing, expected_cycles in EXAMPLES:
+		wiki_scrape = make_example(panels, classes)
+		missing, cycles = resolve_inheritance(wiki_scrape, quiet=True)
+
+		entries = {**wiki_scrape["CLASSES"], **wiki_scrape["PANELS"]}
+		got = {name: (entries[name].get("INHERITS"), entries[name].get("INHERITED")) for name in expected}
+		if got != expected or missing != expected_missing or cycles != expected_cycles:
+			failed += 1
+			print("FAILED " + repr(panels) + " " + repr(classes))
+			print("  expected " + repr((expected, expected_missing, expected_cycles)))
+			print("  got      " + repr((got, missing, cycles)))
+
+	print("{passed}/{count} examples passed".format(passed = len(EXAMPLES) - failed, count = len(EXAMPLES)))
+	if failed > 0: sys.exit(1)
+
+if __name__ == "__main__":
+	main()
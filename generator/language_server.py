@@ -1,9 +1,11 @@
+from collections.abc import Mapping
+
 def language_server(wiki_scrape):
 	language_server_data = {}
 
 	def step(into):
 		for k, v in into.items():
-			if not type(v) is dict: continue
+			if not isinstance(v, Mapping): continue
 			if "SEARCH" in v:
 				def_copy = v.copy()
 				del def_copy["SEARCH"]
@@ -12,4 +14,4 @@ def language_server(wiki_scrape):
 				step(v)
 	step(wiki_scrape)
 
-	return language_server_data
\ No newline at end of file
+	return language_server_data
@@ -0,0 +1,44 @@
+# Caps how many requests are in flight at once, halving the cap whenever the wiki pushes back
+# and growing it by one again after a cap's worth of requests go through fine
+
+import threading
+import time
+
+class AdaptiveLimiter:
+	def __init__(self, limit=1):
+		self.MAX = limit
+		self.LIMIT = limit
+		self.IN_FLIGHT = 0
+		self.SUCCESSES = 0
+		self.PAUSED_UNTIL = 0
+		self.CONDITION = threading.Condition()
+
+	def acquire(self):
+		with self.CONDITION:
+			while True:
+				paused = self.PAUSED_UNTIL - time.monotonic()
+				if paused > 0:
+					self.CONDITION.wait(paused)
+				elif self.IN_FLIGHT >= self.LIMIT:
+					self.CONDITION.wait()
+				else:
+					break
+			self.IN_FLIGHT += 1
+
+	def release(self, throttled=False):
+		with self.CONDITION:
+			self.IN_FLIGHT -= 1
+			if throttled:
+				self.LIMIT = max(1, self.LIMIT // 2)
+				self.SUCCESSES = 0
+			else:
+				self.SUCCESSES += 1
+				if self.SUCCESSES >= self.LIMIT and self.LIMIT < self.MAX:
+					self.LIMIT += 1
+					self.SUCCESSES = 0
+			self.CONDITION.notify_all()
+
+	# Holds back every thread, not just the one that was told to wait
+	def pause(self, seconds):
+		with self.CONDITION:
+			self.PAUSED_UNTIL = max(self.PAUSED_UNTIL, time.monotonic() + seconds)
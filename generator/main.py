@@ -1,37 +1,160 @@
-from scrape import scrape
-from gluadump import gluadump
+# Generates the wiki data the extension ships with
+#
+#   python main.py [flags]            runs every stage below, one after the other
+#   python main.py scrape [flags]     scrapes the wiki into scrape/scraped.json
+#   python main.py merge [--input P]  merges gluadump.json into scrape/scraped.json (or P), into scrape/merged.json
+#   python main.py emit [--input P]   writes wiki.json and everything that goes with it from scrape/merged.json (or P),
+#                                     keeping a copy as scrape/scrape.json
+#
+# Each stage only imports what it needs, so the ones after scrape start without lxml or urllib3.
+# --prescraped skips scraping when there's a scrape/scrape.json and runs the rest from it, like merge + emit.
+
+from profiler import profiler
+from cli import get_arg_value
 
 import os, os.path
-import json, re
+import json
 import sys
 
+SCRAPED_PATH = "scrape/scraped.json"
+MERGED_PATH = "scrape/merged.json"
+SCRAPE_PATH = "scrape/scrape.json"
+
+def load_scrape(path):
+	from records import compact
+
+	f = open(path, "r", encoding="utf-8")
+	wiki_scrape = compact(json.loads(f.read()))
+	f.close()
+	return wiki_scrape
+
+def save_scrape(wiki_scrape, path):
+	from output import write_json
+
+	with profiler.stage("write_json"):
+		write_json(wiki_scrape, [path])
+
+def run_scrape():
+	from scrape import scrape, cache, set_retry_policy, WIKI_URL
+	from cache import PageCache
+
+	# Pages used to be cached as a file each, bring them over the first time round
+	if not os.path.exists(cache.PATH) and len(PageCache().keys()) > 0:
+		print("Imported {count} pages from scrape/ into {path}".format(count = cache.import_directory(), path = cache.PATH))
+
+	print("Scraping wiki...")
+	max_age = get_arg_value("--max-age")
+	timeout = get_arg_value("--timeout")
+	set_retry_policy(retries=int(get_arg_value("--retries", 5)), timeout=timeout and float(timeout))
+	with profiler.stage("scrape"):
+		wiki_scrape = scrape(
+			cached="--cached" in sys.argv,
+			quiet="--quiet" in sys.argv,
+			jobs=int(get_arg_value("--jobs", 1)),
+			wiki_url=get_arg_value("--wiki-url", WIKI_URL),
+			max_age=max_age and float(max_age),
+			incremental="--incremental" in sys.argv,
+			processes=int(get_arg_value("--processes", 1)),
+			checkpoint="--checkpoint" in sys.argv,
+			resume="--resume" in sys.argv,
+		)
+
+	# Anything we didn't request this time round is no longer linked from the sidebar
+	if wiki_scrape != None and "--evict" in sys.argv:
+		evicted = cache.evict()
+		if evicted > 0: cache.compact()
+		print("Evicted {count} orphaned pages from the cache".format(count = evicted))
+	cache.close()
+
+	return wiki_scrape
+
+def run_merge(wiki_scrape):
+	from gluadump import gluadump
+
+	gluadump(wiki_scrape)
+
+def run_emit(wiki_scrape):
+	from output import write_json
+	from delta import write_delta, get_summary
+	from materials import write_manifest
+
+	# Has to come before scrape.json is overwritten, it's what we diff against
+	with profiler.stage("delta"):
+		delta = write_delta(wiki_scrape, SCRAPE_PATH, ["../resources/wiki.delta.json"])
+	if delta is not None: print("Changes since the last run: " + get_summary(delta))
+
+	outputs = [SCRAPE_PATH, "../resources/wiki.json"]
+	if "--gzip" in sys.argv: outputs.append("../resources/wiki.json.gz")
+	with profiler.stage("write_json"):
+		write_json(wiki_scrape, outputs)
+	if "--bundle" in sys.argv:
+		from bundle import write_bundle
+		with profiler.stage("bundle"):
+			write_bundle(wiki_scrape, "../resources/wiki.bundle")
+	with profiler.stage("materials"):
+		materials_dirs = get_arg_value("--materials-dirs")
+		write_manifest(content=get_arg_value("--materials-content"), dirs=materials_dirs.split(",") if materials_dirs else (), inline_max=int(get_arg_value("--inline-materials", 0)))
+
+# The whole pipeline, as main.py has always run it
+def run_all():
+	if "--prescraped" in sys.argv and os.path.exists(SCRAPE_PATH):
+		print("Using prescraped wiki...")
+		wiki_scrape = load_scrape(SCRAPE_PATH)
+	else:
+		wiki_scrape = run_scrape()
+		if wiki_scrape == None: return False
+		# Kept so merge can be rerun on its own later without scraping again
+		save_scrape(wiki_scrape, SCRAPED_PATH)
+
+	run_merge(wiki_scrape)
+	# Same for emit, which reads the merged scrape
+	save_scrape(wiki_scrape, MERGED_PATH)
+	run_emit(wiki_scrape)
+	return True
+
+def command_scrape():
+	wiki_scrape = run_scrape()
+	if wiki_scrape == None: return False
+	save_scrape(wiki_scrape, SCRAPED_PATH)
+	return True
+
+def command_merge():
+	wiki_scrape = load_scrape(get_arg_value("--input", SCRAPED_PATH))
+	run_merge(wiki_scrape)
+	save_scrape(wiki_scrape, MERGED_PATH)
+	return True
+
+def command_emit():
+	run_emit(load_scrape(get_arg_value("--input", MERGED_PATH)))
+	return True
+
+COMMANDS = {
+	"scrape": command_scrape,
+	"merge": command_merge,
+	"emit": command_emit,
+}
+
 def main():
+	command = run_all
+	if len(sys.argv) > 1 and not sys.argv[1].startswith("--"):
+		if sys.argv[1] not in COMMANDS:
+			print("usage: python main.py [" + " | ".join(COMMANDS) + "] [flags]")
+			sys.exit(1)
+		command = COMMANDS[sys.argv[1]]
+
 	if not os.path.isdir("scrape"):
 		os.mkdir("scrape")
 
-	if "--prescraped" in sys.argv and os.path.exists("scrape/scrape.json"):
-		print("Using prescraped wiki...")
-		f = open("scrape/scrape.json", "r", encoding="utf-8")
-		wiki_scrape = json.loads(f.read())
-		f.close()
-	else:
-		print("Scraping wiki...")
-		wiki_scrape = scrape("--cached" in sys.argv, "--quiet" in sys.argv)
-	
-	if wiki_scrape != None:
-		gluadump(wiki_scrape)
-		
-		f = open("scrape/scrape.json", "w", encoding="utf-8")
-		f.write(json.dumps(wiki_scrape))
-		f.close()
-
-		f = open("../resources/wiki.json", "w", encoding="utf-8")
-		f.write(json.dumps(wiki_scrape))
-		f.close()
+	if "--profile" in sys.argv:
+		profiler.enable()
 
+	if command():
 		print("Success")
 	else:
 		print("Failed to scrape wiki")
 
+	if "--profile" in sys.argv:
+		profiler.write(get_arg_value("--profile-output", "scrape/profile.json"), int(get_arg_value("--profile-slowest", 20)))
+
 if __name__ == "__main__":
-	main()
\ No newline at end of file
+	main()
@@ -0,0 +1,89 @@
+# Manifest of the materials the extension completes, so it doesn't have to list their directories on every start
+#
+#   python materials.py [--content DIR --dirs A,B] [--inline BYTES] [--output PATH]
+#
+# Always indexes the icons shipped in resources/materials/, plus the given --dirs of DIR/materials/ when there's
+# a --content tree. Images no bigger than --inline bytes (default 0, none) are inlined as data URIs, which is
+# the only way the extension can preview materials that aren't shipped with it.
+#
+# VERSION  bumped whenever the layout changes
+# DIRS     directory under materials/, ending in / -> {"PATH": where it is shipped in the extension, if it is,
+#          "FILES": [{"NAME", "WIDTH", "HEIGHT", "DATA"}, ...]}, with WIDTH/HEIGHT for PNGs only
+
+import base64
+import os, os.path
+import struct
+
+from cli import get_arg_value
+from output import write_json
+
+MATERIALS_MANIFEST_VERSION = 1
+MATERIALS_PATH = "../resources/materials"
+MATERIALS_MANIFEST_PATH = "../resources/materials.json"
+SHIPPED_MATERIAL_DIRS = ["icon16", "flags16"]
+
+MATERIAL_TYPES = {".png": "image/png", ".jpg": "image/jpeg", ".vmt": None}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# The width and height are the first thing in the IHDR chunk, which always comes right after the signature
+def get_png_size(data):
+	if data[:8] == PNG_SIGNATURE and data[12:16] == b"IHDR":
+		return struct.unpack(">II", data[16:24])
+
+def index_directory(directory, inline_max=0):
+	files = []
+	for name in sorted(os.listdir(directory)):
+		extension = os.path.splitext(name)[1].lower()
+		if extension not in MATERIAL_TYPES: continue
+
+		f = open(os.path.join(directory, name), "rb")
+		data = f.read()
+		f.close()
+
+		file_def = {"NAME": name}
+		size = get_png_size(data)
+		if size is not None:
+			file_def["WIDTH"], file_def["HEIGHT"] = size
+		if MATERIAL_TYPES[extension] is not None and len(data) <= inline_max:
+			file_def["DATA"] = "data:" + MATERIAL_TYPES[extension] + ";base64," + base64.b64encode(data).decode()
+		files.append(file_def)
+	return files
+
+def build_manifest(content=None, dirs=(), inline_max=0):
+	manifest = {"VERSION": MATERIALS_MANIFEST_VERSION, "DIRS": {}}
+	for folder in SHIPPED_MATERIAL_DIRS:
+		directory = os.path.join(MATERIALS_PATH, folder)
+		if not os.path.isdir(directory):
+			print("Skipped materials/" + folder + "/, it isn't in " + MATERIALS_PATH)
+			continue
+		manifest["DIRS"][folder + "/"] = {"PATH": "resources/materials/" + folder + "/", "FILES": index_directory(directory, inline_max)}
+
+	if content is not None:
+		for folder in dirs:
+			folder = folder.strip("/")
+			directory = os.path.join(content, "materials", folder)
+			if not os.path.isdir(directory):
+				print("Skipped materials/" + folder + "/, it isn't in " + content)
+				continue
+			manifest["DIRS"][folder + "/"] = {"FILES": index_directory(directory, inline_max)}
+
+	return manifest
+
+def write_manifest(path=MATERIALS_MANIFEST_PATH, content=None, dirs=(), inline_max=0):
+	manifest = build_manifest(content, dirs, inline_max)
+	write_json(manifest, [path])
+	return manifest
+
+def main():
+	dirs = get_arg_value("--dirs")
+	manifest = write_manifest(
+		get_arg_value("--output", MATERIALS_MANIFEST_PATH),
+		get_arg_value("--content"),
+		dirs.split(",") if dirs else (),
+		int(get_arg_value("--inline", 0)),
+	)
+	for folder, folder_def in manifest["DIRS"].items():
+		print("materials/{folder} {files} files".format(folder = folder, files = len(folder_def["FILES"])))
+
+if __name__ == "__main__":
+	main()
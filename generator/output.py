@@ -0,0 +1,35 @@
+# Writes JSON to several files in one pass as it's encoded, so not even one category of it sits in memory as a string
+
+import gzip
+import json
+
+# Records (see records.py) are written out as the dicts they stand in for
+ENCODER = json.JSONEncoder(separators=(",", ":"), default=lambda record: record.to_dict())
+
+def open_output(path):
+	if path.endswith(".gz"):
+		return gzip.open(path, "wt", encoding="utf-8", newline="\n")
+	else:
+		return open(path, "w", encoding="utf-8", newline="\n")
+
+# iterencode() hands out tiny chunks, a few characters each, which are joined up to about this many before being written
+WRITE_SIZE = 1 << 16
+
+def write_json(obj, paths):
+	files = [open_output(path) for path in paths]
+	try:
+		def write(chunk):
+			for f in files: f.write(chunk)
+
+		chunks = []
+		size = 0
+		for chunk in ENCODER.iterencode(obj):
+			chunks.append(chunk)
+			size += len(chunk)
+			if size >= WRITE_SIZE:
+				write("".join(chunks))
+				chunks = []
+				size = 0
+		write("".join(chunks))
+	finally:
+		for f in files: f.close()
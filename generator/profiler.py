@@ -0,0 +1,72 @@
+# Per-stage wall/CPU timing and counters for the generator, enabled by main.py --profile
+
+from contextlib import contextmanager
+import json
+import threading
+import time
+
+# Bump whenever the layout of the report changes
+PROFILE_VERSION = 1
+
+class Profiler:
+	def __init__(self):
+		self.ENABLED = False
+		self.STAGES = {}
+		self.COUNTERS = {}
+		self.PAGES = []
+		self.LOCK = threading.Lock()
+		self.STARTED = time.perf_counter()
+		self.STARTED_CPU = time.process_time()
+
+	def enable(self):
+		self.ENABLED = True
+		self.STARTED = time.perf_counter()
+		self.STARTED_CPU = time.process_time()
+
+	# CPU time is measured per thread, so stages running on fetch threads don't count each other's work
+	@contextmanager
+	def stage(self, name):
+		if not self.ENABLED:
+			yield
+			return
+
+		wall, cpu = time.perf_counter(), time.thread_time()
+		try:
+			yield
+		finally:
+			self.record(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+	def record(self, name, wall, cpu):
+		if not self.ENABLED: return
+		with self.LOCK:
+			stage = self.STAGES.setdefault(name, {"CALLS": 0, "WALL": 0.0, "CPU": 0.0})
+			stage["CALLS"] += 1
+			stage["WALL"] += wall
+			stage["CPU"] += cpu
+
+	def count(self, name, amount=1):
+		if not self.ENABLED: return
+		with self.LOCK:
+			self.COUNTERS[name] = self.COUNTERS.get(name, 0) + amount
+
+	def page(self, url, parser, wall):
+		if not self.ENABLED: return
+		with self.LOCK:
+			self.PAGES.append((wall, url, parser))
+
+	def report(self, slowest=20):
+		return {
+			"VERSION": PROFILE_VERSION,
+			"WALL": time.perf_counter() - self.STARTED,
+			"CPU": time.process_time() - self.STARTED_CPU,
+			"STAGES": self.STAGES,
+			"COUNTERS": self.COUNTERS,
+			"SLOWEST_PAGES": [{"URL": url, "PARSER": parser, "WALL": wall} for wall, url, parser in sorted(self.PAGES, reverse=True)[:slowest]],
+		}
+
+	def write(self, path, slowest=20):
+		f = open(path, "w", encoding="utf-8", newline="\n")
+		f.write(json.dumps(self.report(slowest), indent="\t"))
+		f.close()
+
+profiler = Profiler()
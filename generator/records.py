@@ -0,0 +1,194 @@
+# Compact records for the entries of a finished scrape
+#
+# Parsing works on plain dicts, since fragments, checkpoints and worker processes all pass them around as JSON,
+# but the scrape is then held in memory for the rest of the run (gluadump, outputs, index), so compact() swaps
+# every entry for a Record: common strings get a slot each and are interned, realm and flag keys become bits,
+# and enum values only keep what differs from the base record shared by their family.
+# Records read and write like the dicts they came from and serialize to the same wiki.json schema.
+
+from collections.abc import MutableMapping
+import sys
+
+# Keys that are set to True are stored as bits instead, realms always getting the lowest ones
+FLAG_BITS = {"CLIENT": 1, "SERVER": 2, "MENU": 4}
+
+def get_flag_bit(key):
+	bit = FLAG_BITS.get(key)
+	if bit is None:
+		bit = FLAG_BITS[key] = 1 << len(FLAG_BITS)
+	return bit
+
+# Names, types, links and values repeat all over the scrape, descriptions hardly ever do
+INTERN_MAX_LENGTH = 64
+
+def intern(value):
+	return sys.intern(value) if type(value) is str and len(value) <= INTERN_MAX_LENGTH else value
+
+# Every key a subclass lists in STRINGS gets a slot of its own, any other key lives in OTHER.
+# COUNT is how many keys the record has, its base's included, kept up to date so len() doesn't have to go looking
+class Record(MutableMapping):
+	__slots__ = ("FLAGS", "OTHER", "BASE", "COUNT")
+	STRINGS = ()
+
+	def __init__(self, entry=(), base=None):
+		for key in self.STRINGS: setattr(self, key, None)
+		self.FLAGS = 0
+		self.OTHER = None
+		self.BASE = base
+		self.COUNT = 0 if base is None else len(base)
+		for key, value in dict(entry).items():
+			self[key] = value
+
+	def get_own(self, key, default=None):
+		if key in self.STRINGS:
+			value = getattr(self, key)
+			if value is not None: return value
+		# A STRINGS key set to True is a flag like any other
+		if key in FLAG_BITS and self.FLAGS & FLAG_BITS[key]:
+			return True
+
+		if self.OTHER is not None: return self.OTHER.get(key, default)
+		return default
+
+	def __getitem__(self, key):
+		value = self.get_own(key, KeyError)
+		if value is not KeyError: return value
+		if self.BASE is not None: return self.BASE[key]
+		raise KeyError(key)
+
+	def get(self, key, default=None):
+		value = self.get_own(key, KeyError)
+		if value is not KeyError: return value
+		if self.BASE is not None: return self.BASE.get(key, default)
+		return default
+
+	def __contains__(self, key):
+		return self.get_own(key, KeyError) is not KeyError or (self.BASE is not None and key in self.BASE)
+
+	def __setitem__(self, key, value):
+		self.discard(key)
+		if self.BASE is None or key not in self.BASE: self.COUNT += 1
+		if key in self.STRINGS and type(value) is str:
+			setattr(self, key, intern(value))
+		elif value is True:
+			self.FLAGS |= get_flag_bit(key)
+		else:
+			if self.OTHER is None: self.OTHER = {}
+			self.OTHER[key] = compact_value(value)
+
+	# Only removes the record's own keys, whatever comes from the base stays
+	def discard(self, key):
+		if key in self.STRINGS and getattr(self, key) is not None:
+			setattr(self, key, None)
+		elif key in FLAG_BITS and self.FLAGS & FLAG_BITS[key]:
+			self.FLAGS &= ~FLAG_BITS[key]
+		elif self.OTHER is not None and key in self.OTHER:
+			del self.OTHER[key]
+		else:
+			return False
+		if self.BASE is None or key not in self.BASE: self.COUNT -= 1
+		return True
+
+	def __delitem__(self, key):
+		own = self.discard(key)
+		if self.BASE is None or key not in self.BASE:
+			if own: return
+			raise KeyError(key)
+
+		# The base is shared with the rest of the family, so this record takes its own copy of it instead
+		entry = self.to_dict()
+		del entry[key]
+		Record.__init__(self, entry)
+
+	def to_dict(self):
+		obj = {}
+		for key in self.STRINGS:
+			value = getattr(self, key)
+			if value is not None: obj[key] = value
+		if self.FLAGS:
+			for key, bit in FLAG_BITS.items():
+				if self.FLAGS & bit: obj[key] = True
+		if self.OTHER is not None:
+			obj.update(self.OTHER)
+		if self.BASE is not None:
+			for key, value in self.BASE.to_dict().items():
+				obj.setdefault(key, value)
+		return obj
+
+	# Same keys in the same order as to_dict(), without building it
+	def __iter__(self):
+		for key in self.STRINGS:
+			if getattr(self, key) is not None: yield key
+		if self.FLAGS:
+			for key, bit in FLAG_BITS.items():
+				if self.FLAGS & bit: yield key
+		if self.OTHER is not None:
+			yield from self.OTHER
+		if self.BASE is not None:
+			for key in self.BASE:
+				if self.get_own(key, KeyError) is KeyError: yield key
+
+	def __len__(self):
+		return self.COUNT
+
+	def __repr__(self):
+		return type(self).__name__ + "(" + repr(self.to_dict()) + ")"
+
+	def copy(self):
+		return self.to_dict()
+
+# Anything with a SEARCH name: functions, hooks, panels, structs, enum values...
+class Entry(Record):
+	__slots__ = ("SEARCH", "LINK", "DESCRIPTION", "VALUE")
+	STRINGS = __slots__
+
+# Arguments, returns, callback parameters, bugs and notes
+class Detail(Record):
+	__slots__ = ("NAME", "TYPE", "DESCRIPTION", "DEFAULT", "TYPE_LINK")
+	STRINGS = __slots__
+
+def compact_value(value):
+	if type(value) is list:
+		return [Detail(item) if type(item) is dict else intern(item) for item in value]
+	return intern(value)
+
+def compact_entries(entries):
+	for name, entry in entries.items():
+		if type(entry) is not dict: continue
+
+		if "SEARCH" in entry:
+			if "MEMBERS" in entry: compact_entries(entry["MEMBERS"])
+			entries[name] = Entry(entry)
+		else:
+			compact_entries(entry)
+
+# Keys that are the same for every value of an enum family are only stored once, on the family's base record,
+# which nothing changes once it's shared (its records count its keys as their own)
+FAMILY_OWN_KEYS = {"SEARCH", "VALUE", "LINK"}
+
+def compact_enums(enums):
+	families = {}
+	for name, enum_def in enums.items():
+		families.setdefault(enum_def.get("FAMILY"), []).append(name)
+
+	for family, names in families.items():
+		first = enums[names[0]]
+		base = None
+		if family is not None and len(names) > 1:
+			shared = {key: value for key, value in first.items() if key not in FAMILY_OWN_KEYS and all(key in enums[name] and enums[name][key] == value for name in names)}
+			if len(shared) > 0: base = Entry(shared)
+
+		for name in names:
+			enum_def = enums[name]
+			if base is not None:
+				enum_def = {key: value for key, value in enum_def.items() if key not in base}
+			enums[name] = Entry(enum_def, base)
+
+# Swaps every entry of the scrape for a Record in place, dropping the dicts as it goes
+def compact(wiki_scrape):
+	for category, entries in wiki_scrape.items():
+		if category == "ENUMS":
+			compact_enums(entries)
+		else:
+			compact_entries(entries)
+	return wiki_scrape
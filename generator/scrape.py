@@ -3,58 +3,161 @@
 WIKI_URL = "https://wiki.facepunch.com"
 
 import hashlib
-import os, os.path
+import json
+import os.path
 import re
 import copy
+import time
+import random
+import email.utils
 from queue import Queue
-from io import StringIO
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from collections import deque
+import multiprocessing
 
-from lxml.etree import tostring, strip_elements
 from lxml import html
 from lxml.cssselect import CSSSelector
 
 import urllib3
+
+from cache import PackedPageCache
+from profiler import profiler
+from records import compact, compact_value
+from callbacks import parse_callback_params
+from inheritance import resolve_inheritance
+from limiter import AdaptiveLimiter
+
+cache = PackedPageCache()
 http = urllib3.PoolManager()
+limiter = AdaptiveLimiter()
+
+# Constructing a CSSSelector translates it to XPath every time, so each one is compiled once and shared
+SELECTORS: dict = {}
+def selector(css):
+	sel = SELECTORS.get(css)
+	if sel is None:
+		sel = SELECTORS[css] = CSSSelector(css)
+	return sel
+
+# Same as selector(":scope > a > b")(elem) for a path of plain tags, but without going through XPath
+def get_children(elem, *tags):
+	elems = [elem]
+	for tag in tags:
+		elems = [child for parent in elems for child in parent.iterchildren(tag)]
+	return elems
+
+def set_max_connections(max_connections):
+	global http, limiter
+	http = urllib3.PoolManager(maxsize=max_connections)
+	limiter = AdaptiveLimiter(max_connections)
+
+REQUEST_TIMEOUT = urllib3.Timeout(connect=10, read=60)
+REQUEST_RETRIES = 5
+BACKOFF_BASE = 1
+BACKOFF_MAX = 60
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# urllib3 still follows redirects, but retrying anything else is left to fetch() so the limiter gets to see it
+NO_RETRIES = urllib3.Retry(total=None, connect=0, read=0, status=0, other=0, redirect=5)
+
+def set_retry_policy(retries=REQUEST_RETRIES, timeout=None):
+	global REQUEST_RETRIES, REQUEST_TIMEOUT
+	REQUEST_RETRIES = retries
+	if timeout is not None:
+		REQUEST_TIMEOUT = urllib3.Timeout(connect=timeout, read=timeout)
+
+def get_retry_after(response):
+	value = response.headers.get("Retry-After")
+	if value is None: return None
+	try:
+		return max(0.0, float(value))
+	except ValueError:
+		pass
+	try:
+		return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+	except (TypeError, ValueError):
+		return None
+
+# Exponential backoff with full jitter, so threads that failed together don't all come back together
+def get_backoff(attempt):
+	return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def fetch(url, headers, quiet=False):
+	for attempt in range(REQUEST_RETRIES + 1):
+		response, error = None, None
+		limiter.acquire()
+		try:
+			response = http.request("GET", url, headers=headers, timeout=REQUEST_TIMEOUT, retries=NO_RETRIES)
+		except urllib3.exceptions.HTTPError as e:
+			error = e
+		finally:
+			limiter.release(throttled=response is None or response.status in RETRY_STATUSES)
+
+		if response is not None and response.status not in RETRY_STATUSES:
+			return response
+		if attempt == REQUEST_RETRIES:
+			if error is not None: raise error
+			return response
+
+		delay = get_retry_after(response) if response is not None else None
+		if delay is None:
+			delay = get_backoff(attempt)
+		else:
+			limiter.pause(delay)
 
-def request(url, cached=False, cache_extension="html", quiet=False):
-	url_md5 = hashlib.md5(url.encode()).hexdigest()
-	cached_path = "scrape/" + url_md5 + "." + cache_extension
+		profiler.count("RETRIES")
+		if not quiet: print("Retrying GET {url} in {delay:.1f}s ({reason})".format(url = url, delay = delay, reason = "HTTP " + str(response.status) if response is not None else type(getattr(error, "reason", None) or error).__name__))
+		time.sleep(delay)
 
-	if cached and os.path.exists(cached_path):
-		if not quiet: print("GET [scrape/{hash}.{extension}] {url}".format(hash = url_md5, url = url, extension=cache_extension))
+def request(url, cached=False, cache_extension="html", quiet=False, max_age=None):
+	cached_response, meta = cache.load(url, cache_extension)
 
-		f = open(cached_path, "r", encoding="utf-8")
-		cached_response = f.read()
-		f.close()
+	if cached_response is not None:
+		if cached:
+			if not quiet: print("GET [cache {key}] {url}".format(key = cache.get_key(url, cache_extension), url = url))
+			profiler.count("CACHE_HITS")
+			return cached_response
 
-		return cached_response
+		if meta is not None and max_age is not None and time.time() - meta["fetched"] <= max_age:
+			if not quiet: print("GET [cache {key}] (fresh) {url}".format(key = cache.get_key(url, cache_extension), url = url))
+			profiler.count("CACHE_HITS")
+			return cached_response
+
+	# Revalidate whatever we have cached, so that unchanged pages come back as 304s
+	headers = {}
+	if cached_response is not None and meta is not None:
+		if meta.get("etag"): headers["If-None-Match"] = meta["etag"]
+		if meta.get("last_modified"): headers["If-Modified-Since"] = meta["last_modified"]
 
 	if not quiet: print("GET " + url)
 
-	response = http.request("GET", url)
-	if response.status >= 200 and response.status < 300:
+	response = fetch(url, headers, quiet)
+	profiler.count("REQUESTS")
+	profiler.count("BYTES_FETCHED", len(response.data))
+
+	if response.status == 304 and cached_response is not None:
+		meta["fetched"] = time.time()
+		cache.touch(url, cache_extension, meta)
+
+		profiler.count("CACHE_HITS")
+		profiler.count("NOT_MODIFIED")
+		return cached_response
+	elif response.status >= 200 and response.status < 300:
 		body = response.data.decode("utf-8")
+		profiler.count("CACHE_MISSES")
 
-		f = open(cached_path, "w", encoding="utf-8", newline="\n")
-		f.write(body)
-		f.close()
+		cache.store(url, cache_extension, body, {
+			"url": url,
+			"etag": response.headers.get("ETag"),
+			"last_modified": response.headers.get("Last-Modified"),
+			"fetched": time.time(),
+		})
 
 		return body
 	else:
 		raise Exception("Got HTTP {status} code from GET {url}".format(status = response.status, url = url))
 
 class WikiParser:
-	PARSED: dict = {
-		"GLOBALS": {},
-		"HOOKS": {},
-		"PANELS": {},
-		"ENUMS": {},
-		"CLASSES": {},
-		"LIBRARIES": {},
-		"STRUCTS": {},
-	}
-
-	LINKS: dict = {}
 	def add_wiki_link(self, obj, elem, name, interpolate=False):
 		if "href" in elem.attrib:
 			link = elem.attrib["href"].removeprefix("/gmod/")
@@ -80,79 +183,376 @@ class WikiParser:
 
 	## Parsing Wiki Pages ##
 
-	PAGE_PARSE_QUEUE: Queue = Queue()
-	def queue_page_parse(self, func, *args):
-		self.PAGE_PARSE_QUEUE.put((func, args))
+	def queue_page_parse(self, func, url, page_def):
+		self.PAGE_PARSE_QUEUE.put((func, url, page_def))
 
 	def process_page_parse_queue(self):
+		queue = []
 		while not self.PAGE_PARSE_QUEUE.empty():
-			process, args = self.PAGE_PARSE_QUEUE.get()
-			process(*args)
+			queue.append(self.PAGE_PARSE_QUEUE.get())
+
+		self.PAGES_LEFT = {}
+		for _, _, page_def in queue:
+			self.PAGES_LEFT[id(page_def)] = self.PAGES_LEFT.get(id(page_def), 0) + 1
+
+		if self.CHECKPOINTING:
+			completed = self.open_checkpoint(queue)
+			for (process, url, page_def), (key, fragment) in zip(queue, completed):
+				self.apply_fragment(fragment, page_def)
+				if self.INCREMENTAL: self.PARSED_FRAGMENTS[key] = fragment
+				self.finish_page(page_def)
+				# Never requested this time round, but still linked, so --evict has to keep it
+				cache.mark_used(self.get_wiki_page_url(url), "xml")
+			if len(completed) > 0:
+				print("Resuming from page {page} of {pages}".format(page = len(completed) + 1, pages = len(queue)))
+			queue = queue[len(completed):]
+
+		try:
+			self.process_pages(queue)
+		finally:
+			if self.CHECKPOINT is not None: self.close_checkpoint()
+
+		# Nothing left to resume
+		if self.CHECKPOINTING and os.path.exists(self.CHECKPOINT_PATH):
+			os.remove(self.CHECKPOINT_PATH)
+
+	def process_pages(self, queue):
+		# Pages can be fetched concurrently, but they are always merged into PARSED in queue order
+		# so that it comes out exactly the same as it would from a serial run
+		executor = None
+		if self.JOBS > 1:
+			set_max_connections(self.JOBS)
+			executor = ThreadPoolExecutor(max_workers=self.JOBS)
+			bodies = self.fetch_ahead(executor, [url for _, url, _ in queue])
+		else:
+			bodies = map(self.fetch_wiki_page, [url for _, url, _ in queue])
 
-	REGEX_COMPRESS_NEWLINES = r"\n{3,}"
+		try:
+			if self.PROCESSES > 1:
+				self.parse_pages_in_processes(queue, bodies)
+			else:
+				for (process, url, page_def), body in zip(queue, bodies):
+					self.parse_page(process, url, body, page_def)
+		finally:
+			if executor is not None: executor.shutdown(cancel_futures=True)
+
+	# executor.map would fetch the whole queue straight away, holding every body until it's parsed
+	def fetch_ahead(self, executor, urls):
+		fetching = deque()
+		for url in urls:
+			fetching.append(executor.submit(self.fetch_wiki_page, url))
+			if len(fetching) >= self.PARSE_WINDOW * self.JOBS:
+				yield fetching.popleft().result()
+		while len(fetching) > 0:
+			yield fetching.popleft().result()
+
+	# Pages handed to the workers but not merged yet, per worker, so bodies and fragments never pile up in the parent
+	PARSE_WINDOW = 4
+
+	def parse_pages_in_processes(self, queue, bodies):
+		pool = ProcessPoolExecutor(max_workers=self.PROCESSES, mp_context=multiprocessing.get_context("spawn"), initializer=init_parse_worker)
+
+		# Pages are merged in queue order, each one as soon as it and everything before it is parsed,
+		# so the checkpoint keeps up with the workers instead of waiting for the whole queue to be submitted.
+		# Once PARSE_WINDOW pages per worker are waiting, nothing more is fetched until the oldest one is merged
+		parsing = deque()
+		def merge_next():
+			process, url, body, page_def, key, fragment = parsing.popleft()
+			if fragment is None:
+				self.parse_page(process, url, body, page_def)
+				return
+
+			if isinstance(fragment, Future):
+				# The workers time their own parsing, since the profiler only sees this process
+				fragment, wall, cpu = fragment.result()
+				profiler.record(process.__name__, wall, cpu)
+				profiler.page(url, process.__name__, wall)
+
+			with profiler.stage("merge"):
+				self.apply_fragment(fragment, page_def)
+			self.record_fragment(key, fragment)
+			self.finish_page(page_def)
+
+		def is_parsed(fragment):
+			return not isinstance(fragment, Future) or fragment.done()
+
+		try:
+			queued_defs = set()
+			for (process, url, page_def), body in zip(queue, bodies):
+				# A page whose definition was already queued for another page has to see that page's changes,
+				# so it can't be parsed ahead of time
+				if id(page_def) in queued_defs:
+					parsing.append((process, url, body, page_def, None, None))
+				else:
+					queued_defs.add(id(page_def))
+
+					key, fragment = None, None
+					if self.INCREMENTAL or self.CHECKPOINTING:
+						key = self.get_fragment_key(process, body, page_def)
+					if self.INCREMENTAL:
+						fragment = self.get_stored_fragment(key)
+					if fragment is None:
+						fragment = pool.submit(parse_page_fragment, process.__name__, body, page_def)
+
+					parsing.append((process, url, None, page_def, key, fragment))
+
+				while len(parsing) > 0 and (is_parsed(parsing[0][5]) or len(parsing) >= self.PARSE_WINDOW * self.PROCESSES):
+					merge_next()
+
+			while len(parsing) > 0:
+				merge_next()
+		except Exception:
+			# Whatever was fetched before the failure still gets merged, so --resume doesn't have to redo it
+			try:
+				while len(parsing) > 0: merge_next()
+			except Exception:
+				pass
+			raise
+		finally:
+			pool.shutdown(cancel_futures=True)
+
+	## Incremental Parsing ##
+
+	# Each page parse is stored as a fragment of the keys it changed, keyed by a hash of the page body and the
+	# definition it started from, so unchanged pages can skip parsing entirely. Descriptions are only rendered
+	# once a page is merged, after its fragment is taken, so fragments don't depend on LINKS and survive any change to the sidebar
+	FRAGMENTS_PATH = "scrape/fragments.json"
+
+	# Bump whenever what a fragment holds changes, so old ones are never reused
+	FRAGMENTS_VERSION = 2
+
+	def load_fragments(self):
+		self.FRAGMENTS = {}
+		self.PARSED_FRAGMENTS = {}
+		if os.path.exists(self.FRAGMENTS_PATH):
+			f = open(self.FRAGMENTS_PATH, "r", encoding="utf-8")
+			self.FRAGMENTS = json.loads(f.read())
+			f.close()
+
+	def save_fragments(self):
+		# Only keep the fragments of pages that are still around
+		f = open(self.FRAGMENTS_PATH, "w", encoding="utf-8", newline="\n")
+		f.write(json.dumps(self.PARSED_FRAGMENTS))
+		f.close()
+
+	def get_fragment_key(self, process, body, page_def):
+		return hashlib.md5((str(self.FRAGMENTS_VERSION) + "\n" + process.__name__ + "\n" + json.dumps(page_def) + "\n" + body).encode()).hexdigest()
+
+	def get_stored_fragment(self, key):
+		fragment = self.FRAGMENTS.get(key)
+		if fragment is not None:
+			profiler.count("FRAGMENT_HITS")
+			return fragment
+		profiler.count("FRAGMENT_MISSES")
+
+	def parse_fragment(self, process, body, page_def):
+		state = {key: json.dumps(value) for key, value in page_def.items()}
+
+		self.FRAGMENT = {"ENUMS": {}}
+		try:
+			process(self.get_wiki_page_markup(body), page_def)
+			fragment = self.FRAGMENT
+		finally:
+			self.FRAGMENT = None
+
+		fragment["DEF"] = {key: copy.deepcopy(value) for key, value in page_def.items() if json.dumps(value) != state.get(key)}
+		# The enum values in PARSED get rendered in place, the fragment's have to stay as they were parsed
+		fragment["ENUMS"] = copy.deepcopy(fragment["ENUMS"])
+		fragment["DELETED"] = [key for key in state if key not in page_def]
+		return fragment
+
+	def parse_page(self, process, url, body, page_def):
+		start = time.perf_counter()
+		with profiler.stage(process.__name__):
+			self.parse_page_incremental(process, body, page_def)
+		profiler.page(url, process.__name__, time.perf_counter() - start)
+		self.finish_page(page_def)
+
+	def parse_page_incremental(self, process, body, page_def):
+		if not self.INCREMENTAL and not self.CHECKPOINTING:
+			process(self.get_wiki_page_markup(body), page_def)
+			return
+
+		key = self.get_fragment_key(process, body, page_def)
+		fragment = self.get_stored_fragment(key) if self.INCREMENTAL else None
+		if fragment is None:
+			fragment = self.parse_fragment(process, body, page_def)
+		else:
+			self.apply_fragment(fragment, page_def)
+
+		self.record_fragment(key, fragment)
+
+	def record_fragment(self, key, fragment):
+		if self.INCREMENTAL: self.PARSED_FRAGMENTS[key] = fragment
+		if self.CHECKPOINT is not None:
+			self.CHECKPOINT.write(json.dumps([key, fragment]) + "\n")
+			self.CHECKPOINT.flush()
+
+	## Checkpointing ##
+
+	# With --checkpoint, every merged page appends its fragment to the checkpoint, so a run that dies halfway through
+	# the queue can be resumed with --resume from the first page it didn't get to, as long as the page queue is still
+	# the same. It's off otherwise, since fragments cost a couple of json.dumps and a deepcopy per page
+	CHECKPOINT_PATH = "scrape/checkpoint.jsonl"
+
+	def get_queue_hash(self, queue):
+		return hashlib.md5(json.dumps([self.FRAGMENTS_VERSION, [[process.__name__, url, page_def] for process, url, page_def in queue]]).encode()).hexdigest()
+
+	def open_checkpoint(self, queue):
+		queue_hash = self.get_queue_hash(queue)
+
+		completed = []
+		if self.RESUME and os.path.exists(self.CHECKPOINT_PATH):
+			f = open(self.CHECKPOINT_PATH, "r", encoding="utf-8")
+			lines = f.read().splitlines()
+			f.close()
+
+			if len(lines) > 0 and json.loads(lines[0]) == queue_hash:
+				for line in lines[1:]:
+					# The last line can be cut short by whatever stopped the run
+					try:
+						completed.append(json.loads(line))
+					except ValueError:
+						break
+
+		# Rewritten from scratch so that a cut short line doesn't end up in the middle of it
+		self.CHECKPOINT = open(self.CHECKPOINT_PATH, "w", encoding="utf-8", newline="\n")
+		self.CHECKPOINT.write(json.dumps(queue_hash) + "\n")
+		for line in completed:
+			self.CHECKPOINT.write(json.dumps(line) + "\n")
+		self.CHECKPOINT.flush()
+
+		return completed
+
+	def close_checkpoint(self):
+		self.CHECKPOINT.close()
+		self.CHECKPOINT = None
+
+	def apply_fragment(self, fragment, page_def):
+		for key in fragment["DELETED"]:
+			del page_def[key]
+		page_def.update(copy.deepcopy(fragment["DEF"]))
+		enums = copy.deepcopy(fragment["ENUMS"])
+		self.PARSED["ENUMS"].update(enums)
+		self.UNRENDERED.extend(enums.values())
+
+	# Renders a page's markups once it's merged, which keeps the markup runs of only a page or so around instead of
+	# every page's. LINKS is complete as soon as the sidebar is parsed, but a definition that more than one page is
+	# queued for is still read by the pages after the first, so it waits for its last one
+	def finish_page(self, page_def):
+		self.PAGES_LEFT[id(page_def)] -= 1
+		if self.PAGES_LEFT[id(page_def)] == 0:
+			del self.PAGES_LEFT[id(page_def)]
+			self.UNRENDERED.append(page_def)
+
+		with profiler.stage("render"):
+			for obj in self.UNRENDERED:
+				self.render_markups(obj)
+		self.UNRENDERED.clear()
+
+		# Nothing reads a finished page's arguments and returns as dicts, so they're made records straight away
+		if id(page_def) not in self.PAGES_LEFT:
+			for key, value in page_def.items():
+				if type(value) is list: page_def[key] = compact_value(value)
+
+	REGEX_COMPRESS_NEWLINES = re.compile(r"\n{3,}")
 	def compress_newlines(self, text):
-		return re.sub(self.REGEX_COMPRESS_NEWLINES, "\n\n", text).strip()
+		return self.REGEX_COMPRESS_NEWLINES.sub("\n\n", text).strip()
 
-	def interpolate_wiki_links(self, elem):
-		if len(elem) > 0:
-			elem_copy = copy.deepcopy(elem)
+	## Markup ##
+
+	# Descriptions, notes and warnings are parsed into {"MARKUP": [piece, ...]}, where each piece is a list of
+	# runs of text and [page] links, and are only rendered to markdown by render_markups() once their page is merged.
+	# Links that don't need LINKS to be rendered are rendered straight away
 
-			for child in elem_copy:
+	def parse_wiki_link(self, page_elem):
+		page = page_elem.text_content().strip()
+		link = "/gmod/" + page.replace(" ", "%20")
+		if "text" in page_elem.attrib:
+			return "[" + page_elem.attrib["text"].strip() + "](" + link + ")"
+		elif page.startswith("Enums/"):
+			return "[" + page[len("Enums/"):] + "](" + link + ")"
+		else:
+			return [page]
+
+	def parse_markup(self, elem):
+		if len(elem) > 0:
+			# Only the element's own text, its <page> links and the tails of its children make it into the markdown
+			runs = [elem.text or ""]
+			for child in elem:
 				if child.tag == "page":
-					page = child.text_content().strip()
-					link = "/gmod/" + page.replace(" ", "%20")
-					if "text" in child.attrib:
-						link_text = "[" + child.attrib["text"].strip() + "](" + link + ")"
-					elif page.startswith("Enums/"):
-						link_text = "[" + page[len("Enums/"):] + "](" + link + ")"
-					elif page in self.LINKS:
-						link_text = "[" + self.LINKS[page] + "](" + link + ")"
-					else:
-						link_text = "[" + page + "](" + link + ")"
+					runs.append(self.parse_wiki_link(child))
+				if child.tail:
+					runs.append(child.tail)
+		else:
+			runs = [elem.text_content()]
 
-					child.tail = link_text + (child.tail or '')
+		if any(type(run) is list or len(run.strip()) > 0 for run in runs):
+			return {"MARKUP": [runs]}
 
-			strip_elements(elem_copy, "*", with_tail=False)
+	def is_markup(self, value):
+		return type(value) is dict and "MARKUP" in value
 
-			text = elem_copy.text_content().strip()
-		else:
-			text = elem.text_content().strip()
+	# The text of a markup with its links left as page names, for checks that can't wait for rendering
+	def get_markup_text(self, markup):
+		return "\n\n".join("".join(run if type(run) is str else run[0] for run in piece) for piece in markup["MARKUP"])
+
+	def render_wiki_link(self, page):
+		return "[" + (self.LINKS.get(page) or page) + "](/gmod/" + page.replace(" ", "%20") + ")"
+
+	def render_markup(self, markup):
+		return "\n\n".join(self.compress_newlines("".join(run if type(run) is str else self.render_wiki_link(run[0]) for run in piece)) for piece in markup["MARKUP"])
+
+	# Renders every markup in obj with the finished LINKS
+	def render_markups(self, obj):
+		for key, value in (obj.items() if type(obj) is dict else enumerate(obj)):
+			if self.is_markup(value):
+				obj[key] = self.render_markup(value)
+			elif type(value) is dict or type(value) is list:
+				self.render_markups(value)
 
-		text = text.strip()
-		if len(text) > 0:
-			return text
+		if type(obj) is dict:
+			for key in ["NOTES", "WARNINGS"]:
+				if key in obj: obj[key] = sorted(obj[key], key=len)
+			for arg_def in obj.get("ARGUMENTS", []):
+				self.add_callback_def(arg_def)
 
-	def get_wiki_page_markup(self, url):
-		body = request(WIKI_URL + url.removeprefix(WIKI_URL) + "?format=text", self.USE_CACHE, "xml", self.QUIET)
+	def get_wiki_page_url(self, url):
+		return self.WIKI_URL + url.removeprefix(self.WIKI_URL) + "?format=text"
+
+	def fetch_wiki_page(self, url):
+		with profiler.stage("fetch"):
+			return request(self.get_wiki_page_url(url), self.USE_CACHE, "xml", self.QUIET, self.MAX_AGE)
+
+	def get_wiki_page_markup(self, body):
 		return html.fromstring(body)
 
 	# FIXME derma.SkinList
 
 	def parse_view_source(self, item, item_def):
-		for src in CSSSelector(":scope > file")(item):
+		for src in selector(":scope > file")(item):
 			if "line" in src.attrib:
 				item_def["SRC"] = [src.text_content().strip(), src.attrib["line"].replace("L", "")]
 
 	def parse_text_content(self, item, item_def=False):
-		description = self.interpolate_wiki_links(item)
+		description = self.parse_markup(item)
 		if description:
-			description = self.compress_newlines(description)
 			if item_def == False:
 				return description
 			else:
 				if "DESCRIPTION" in item_def:
-					item_def["DESCRIPTION"] = item_def["DESCRIPTION"] + "\n\n" + description
+					item_def["DESCRIPTION"] = {"MARKUP": item_def["DESCRIPTION"]["MARKUP"] + description["MARKUP"]}
 				else:
 					item_def["DESCRIPTION"] = description
 
 	def add_item_content_def(self, item, item_def):
 		self.parse_text_content(item, item_def)
 
-		sel_deprecated = CSSSelector(":scope > deprecated")
-		sel_removed = CSSSelector(":scope > removed")
-		sel_notes = CSSSelector(":scope > note")
-		sel_warnings = CSSSelector(":scope > warning")
-		sel_bugs = CSSSelector(":scope > bug")
+		sel_deprecated = selector(":scope > deprecated")
+		sel_removed = selector(":scope > removed")
+		sel_notes = selector(":scope > note")
+		sel_warnings = selector(":scope > warning")
+		sel_bugs = selector(":scope > bug")
 
 		for deprecated in list(sel_deprecated(item)) + list(sel_removed(item)):
 			deprecated_content = deprecated.text_content().strip()
@@ -185,8 +585,6 @@ class WikiParser:
 					item_def["NOTES"] = []
 				item_def["NOTES"].append(note_content)
 			item.remove(note)
-		if "NOTES" in item_def:
-			item_def["NOTES"] = sorted(item_def["NOTES"], key=len)
 
 		for warning in sel_warnings(item):
 			warning_content = self.parse_text_content(warning)
@@ -195,25 +593,27 @@ class WikiParser:
 					item_def["WARNINGS"] = []
 				item_def["WARNINGS"].append(warning_content)
 			item.remove(warning)
-		if "WARNINGS" in item_def:
-			item_def["WARNINGS"] = sorted(item_def["WARNINGS"], key=len)
 
-	#REGEX_EXTRACT_CALLBACK_ARGS = r"(?:\(\s*(.+?,\s*.+?)\s*\)|<page(?:\s*[^>]++)?>([^<>\s]+?)<\/page>(?:\s*(.+?)\s*-.*?$|\s*(.+?)$))"
-	REGEX_EXTRACT_CALLBACK_ARGS = r"(?:^(?:\* +)?|: +)\[(.+?)\]\((.+?)\) +(?:(.+) +- +(.+?)$|(.+))"
+	# Callback parameters are read out of the rendered description, so this happens in render_markups()
+	def add_callback_def(self, arg_def):
+		if arg_def.get("TYPE") == "function" and "DESCRIPTION" in arg_def:
+			params = parse_callback_params(arg_def["DESCRIPTION"])
+			if len(params) > 0: arg_def["CALLBACK"] = params
+
 	def parse_generic_func(self, item, item_def):
 		if "FUNCTION" not in item_def and "EVENT" not in item_def:
 			# We're looking at an actual category page here
-			for cat in CSSSelector("cat")(item): item.remove(cat)
+			for cat in selector("cat")(item): item.remove(cat)
 			self.add_item_content_def(item, item_def)
 			return
 
-		self.parse_view_source(CSSSelector("function")(item)[0], item_def)
+		self.parse_view_source(selector("function")(item)[0], item_def)
 
-		description_elem = CSSSelector("function > description")(item)
+		description_elem = selector("function > description")(item)
 		if len(description_elem) > 0: self.add_item_content_def(description_elem[0], item_def)
 
-		find_enum_links = CSSSelector(":scope > page")
-		for arg in CSSSelector("function > args > arg")(item):
+		find_enum_links = selector(":scope > page")
+		for arg in selector("function > args > arg")(item):
 			if "ARGUMENTS" not in item_def:
 				item_def["ARGUMENTS"] = []
 
@@ -234,20 +634,9 @@ class WikiParser:
 
 			self.add_item_content_def(arg, arg_def)
 
-			if arg_def["TYPE"] == "function" and "DESCRIPTION" in arg_def:
-				for match in re.finditer(self.REGEX_EXTRACT_CALLBACK_ARGS, arg_def["DESCRIPTION"], re.MULTILINE):
-					if not "CALLBACK" in arg_def: arg_def["CALLBACK"] = []
-					name = match.group(3) or match.group(5)
-					callback_param_def = {}
-					callback_param_def["TYPE"] = match.group(1)
-					callback_param_def["TYPE_LINK"] = match.group(2)
-					if name: callback_param_def["NAME"] = name
-					if match.group(4): callback_param_def["DESCRIPTION"] = match.group(4)
-					arg_def["CALLBACK"].append(callback_param_def)
-
 			item_def["ARGUMENTS"].append(arg_def)
 
-		for ret in CSSSelector("function > rets > ret")(item):
+		for ret in selector("function > rets > ret")(item):
 			if "RETURNS" not in item_def:
 				item_def["RETURNS"] = []
 
@@ -261,13 +650,13 @@ class WikiParser:
 
 			item_def["RETURNS"].append(ret_def)
 
-	def parse_struct(self, struct_name, url, struct_def):
-		body = self.get_wiki_page_markup(url)
+	def parse_struct(self, body, struct_def):
+		struct_name = struct_def["SEARCH"]
 
-		description_elem = CSSSelector(":scope > structure > description")(body)
+		description_elem = selector(":scope > structure > description")(body)
 		if len(description_elem) > 0: self.add_item_content_def(description_elem[0], struct_def)
 
-		for field in CSSSelector("fields > item")(body):
+		for field in selector("fields > item")(body):
 			field_name = field.attrib["name"]
 
 			field_def = {}
@@ -278,46 +667,40 @@ class WikiParser:
 				field_def["DEFAULT"] = field.attrib["default"]
 
 			self.add_item_content_def(field, field_def)
-			self.PARSED["STRUCTS"][struct_name]["MEMBERS"][field_name] = field_def
-
-	def parse_function(self, url, func_def):
-		self.parse_generic_func(self.get_wiki_page_markup(url), func_def)
+			struct_def["MEMBERS"][field_name] = field_def
 
-	def parse_library(self, url, lib_def):
-		body = self.get_wiki_page_markup(url)
+	def parse_function(self, body, func_def):
+		self.parse_generic_func(body, func_def)
 
+	def parse_library(self, body, lib_def):
 		# Panel
-		panel = CSSSelector("panel")(body)
+		panel = selector("panel")(body)
 		if len(panel) > 0:
-			parent = CSSSelector(":scope > parent")(panel[0])
+			parent = selector(":scope > parent")(panel[0])
 			if len(parent) > 0: lib_def["PARENT"] = parent[0].text_content().strip()
 
-			preview = CSSSelector(":scope > preview")(panel[0])
+			preview = selector(":scope > preview")(panel[0])
 			if len(preview) > 0: lib_def["PREVIEW"] = preview[0].text_content().strip()
 
-			description_elem = CSSSelector(":scope > description")(panel[0])
+			description_elem = selector(":scope > description")(panel[0])
 			if len(description_elem) > 0: self.add_item_content_def(description_elem[0], lib_def)
 			return
 
 		# Library/Class
-		summary_elem = CSSSelector("summary")(body)
+		summary_elem = selector("summary")(body)
 		if len(summary_elem) > 0:
 			self.add_item_content_def(summary_elem[0], lib_def)
 			return
 
-	def parse_hook(self, url, hook_def):
-		body = self.get_wiki_page_markup(url)
-
-		predicted = CSSSelector("function > predicted")(body)
+	def parse_hook(self, body, hook_def):
+		predicted = selector("function > predicted")(body)
 		if len(predicted) > 0 and predicted[0].text_content().strip() == "Yes":
 			hook_def["PREDICTED"] = True
 
 		self.parse_generic_func(body, hook_def)
 
-	def parse_enum(self, url, enum_def_base):
-		body = self.get_wiki_page_markup(url)
-
-		description_elem = CSSSelector("enum > description")(body)
+	def parse_enum(self, body, enum_def_base):
+		description_elem = selector("enum > description")(body)
 		if len(description_elem) > 0: self.add_item_content_def(description_elem[0], enum_def_base)
 
 		if "DESCRIPTION" in enum_def_base:
@@ -328,7 +711,7 @@ class WikiParser:
 		if "WARNINGS" in enum_def_base:
 			new_warnings = []
 			for warning in enum_def_base["WARNINGS"]:
-				if "reference" in warning:
+				if "reference" in self.get_markup_text(warning):
 					reference_only = True
 				else:
 					new_warnings.append(warning)
@@ -337,21 +720,29 @@ class WikiParser:
 			else:
 				enum_def_base["WARNINGS"] = new_warnings
 
-		for enum in CSSSelector("items > item")(body):
-			enum_name = enum.attrib["key"]
-
-			enum_names = enum_name.split(" or ")
-			while (len(enum_names) > 0):
-				enum_name = enum_names.pop()
+		for enum in selector("items > item")(body):
+			# Parsed once for every name the value goes by
+			item_def = {}
+			self.add_item_content_def(enum, item_def)
 
+			for enum_name in reversed(enum.attrib["key"].split(" or ")):
 				enum_def = dict(enum_def_base)
 				enum_def["SEARCH"] = enum_name
 				enum_def["VALUE"] = enum.attrib["value"]
 				enum_def["LINK"] = enum_def["LINK"] + "#" + enum_name
 				if reference_only: enum_def["REF_ONLY"] = True
 
-				self.add_item_content_def(enum, enum_def)
+				for key, value in item_def.items():
+					# Lists add to whatever the family has, without touching the family's own list
+					if type(value) is list and type(enum_def.get(key)) is list:
+						enum_def[key] = enum_def[key] + value
+						if key == "DEPRECATED": enum_def[key] = sorted(enum_def[key], key=len)
+					else:
+						enum_def[key] = value
+
 				self.PARSED["ENUMS"][enum_name] = enum_def
+				self.UNRENDERED.append(enum_def)
+				if self.FRAGMENT is not None: self.FRAGMENT["ENUMS"][enum_name] = enum_def
 
 	## Parsing Sidebar ##
 
@@ -378,7 +769,7 @@ class WikiParser:
 			self.add_wiki_link(struct_def, child, name, True)
 			self.PARSED["STRUCTS"][name] = struct_def
 
-			self.queue_page_parse(self.parse_struct, name, child.attrib["href"], struct_def)
+			self.queue_page_parse(self.parse_struct, child.attrib["href"], struct_def)
 
 	def parse_subcategory(self, category, parsed, category_items):
 		for child in list(category_items):
@@ -391,19 +782,17 @@ class WikiParser:
 			self.add_wiki_link(subcategory_def, child, name)
 			parsed[name] = subcategory_def
 
-			link = CSSSelector(":scope > summary > a")(child)
+			link = get_children(child, "summary", "a")
 			if link:
 				if "href" in link[0].attrib: self.queue_page_parse(self.parse_library, link[0].attrib["href"], subcategory_def)
 				self.parse_subcategories(subcategory_def, child, deprecated="depr" in child.classes)
 			else:
-				link = CSSSelector("a.cm")(child)
-				for item in link: self.queue_page_parse(self.parse_library, item.attrib["href"], subcategory_def)
+				for item in child.iter("a"):
+					if "cm" in item.classes: self.queue_page_parse(self.parse_library, item.attrib["href"], subcategory_def)
 
 	def parse_subcategories(self, parent_def, subcategory, deprecated=False):
-		sel_category_list = CSSSelector(":scope > details")
-		sel_category_item = CSSSelector(":scope > a")
-		for item in CSSSelector(":scope > ul > li")(subcategory):
-			category_item = sel_category_item(item)
+		for item in get_children(subcategory, "ul", "li"):
+			category_item = get_children(item, "a")
 			if len(category_item) >= 1:
 				category_item = category_item[0]
 
@@ -431,26 +820,43 @@ class WikiParser:
 				parent_def["MEMBERS"][item_name] = subcategory_def
 
 				deprecated = deprecated or "depr" in item.classes
-				self.parse_subcategories(subcategory_def, sel_category_list(item)[0], deprecated=deprecated)
+				self.parse_subcategories(subcategory_def, get_children(item, "details")[0], deprecated=deprecated)
 
+	# The first link straight inside a <summary>, or just the first link when there isn't one
 	def get_subcategory_name(self, subcategory):
-		return (CSSSelector("summary > a")(subcategory) or CSSSelector("a")(subcategory))[0].text_content().strip()#attrib["search"].strip().replace(" ", "_")
-
-	def __init__(self, cached=False, quiet=False):
-		self.USE_CACHE = cached
-		self.QUIET = quiet
-
-		self.TREE = html.fromstring(request(WIKI_URL + "/gmod/", self.USE_CACHE, "html", self.QUIET))
+		first = None
+		for link in subcategory.iter("a"):
+			if link.getparent().tag == "summary": return link.text_content().strip()
+			if first is None: first = link
+		return first.text_content().strip()
+
+	# Sorts out every link and category the pages are queued from in one walk over the sidebar, in document order
+	def get_sidebar_nodes(self):
+		panels, hooks, enums, categories = [], [], [], []
+		for elem in self.TREE.iter("a", "details"):
+			classes = elem.get("class", "").split()
+			if elem.tag == "details":
+				if "level1" in classes: categories.append(elem)
+			elif "cm" in classes:
+				if "panel" in classes: panels.append(elem)
+				if "event" in classes: hooks.append(elem)
+				if "enum" in classes: enums.append(elem)
+		return panels, hooks, enums, categories
+
+	def parse_sidebar(self):
+		self.TREE = html.fromstring(request(self.WIKI_URL + "/gmod/", self.USE_CACHE, "html", self.QUIET, self.MAX_AGE))
+
+		panels, hooks, enums, categories = self.get_sidebar_nodes()
 
 		# Discover panels first
 		# Panels must be found first to ensure PANEL hooks are filtered out
-		for panel in CSSSelector("a.cm.panel")(self.TREE):
+		for panel in panels:
 			name = panel.attrib["search"]
 			name = name.replace(" ", "_")
 			self.PARSED["PANELS"][name] = {}
 
 		# Register hooks
-		for hook in CSSSelector("a.cm.event")(self.TREE):
+		for hook in hooks:
 			path = hook.attrib["search"].split(":")
 
 			parent = path[0]
@@ -483,7 +889,7 @@ class WikiParser:
 			self.queue_page_parse(self.parse_hook, hook.attrib["href"], hook_def)
 
 		# Register enums
-		for enum in CSSSelector("a.cm.enum")(self.TREE):
+		for enum in enums:
 			enum_def = {}
 			enum_def["LINK"] = enum.attrib["href"].removeprefix("/gmod/")
 			enum_def["FAMILY"] = enum.attrib["search"]
@@ -492,32 +898,71 @@ class WikiParser:
 			self.queue_page_parse(self.parse_enum, enum.attrib["href"], enum_def)
 
 		# Iterate through sidebar categories
-		sel_category_name  = CSSSelector(":scope > summary > div")
-		sel_category_list  = CSSSelector(":scope > ul > li > a")
-		sel_category_items = CSSSelector(":scope > ul > li > details.level2")
-		for category in CSSSelector("details.level1")(self.TREE):
-			div = sel_category_name(category)[0]
+		for category in categories:
+			div = get_children(category, "summary", "div")[0]
 			div.remove(div[1])
 			name = div.text_content().strip()
 
+			category_list = get_children(category, "ul", "li", "a")
+			category_items = [item for item in get_children(category, "ul", "li", "details") if "level2" in item.classes]
+
 			if name == "Globals":
 				print("=========== Globals ===========")
-				self.parse_globals("GLOBALS", sel_category_list(category))
+				self.parse_globals("GLOBALS", category_list)
 			elif name == "Structs":
 				print("=========== Structs ===========")
-				self.parse_struct_category(sel_category_list(category))
+				self.parse_struct_category(category_list)
 			elif name == "Panels":
 				print("=========== Panels ===========")
-				self.parse_subcategory(category, self.PARSED["PANELS"], sel_category_items(category) + CSSSelector(":scope > ul > li > a.cm")(category))
+				self.parse_subcategory(category, self.PARSED["PANELS"], category_items + [item for item in category_list if "cm" in item.classes])
 			elif name == "Classes":
 				print("=========== Classes ===========")
-				self.parse_subcategory(category, self.PARSED["CLASSES"], sel_category_items(category))
+				self.parse_subcategory(category, self.PARSED["CLASSES"], category_items)
 			elif name == "Libraries":
 				print("=========== Libraries ===========")
-				self.parse_subcategory(category, self.PARSED["LIBRARIES"], sel_category_items(category))
+				self.parse_subcategory(category, self.PARSED["LIBRARIES"], category_items)
+
+	def __init__(self, cached=False, quiet=False, jobs=1, wiki_url=WIKI_URL, max_age=None, incremental=False, processes=1, checkpoint=False, resume=False):
+		self.USE_CACHE = cached
+		self.QUIET = quiet
+		self.MAX_AGE = max_age
+		self.INCREMENTAL = incremental
+		self.CHECKPOINTING = checkpoint or resume
+		self.RESUME = resume
+		self.JOBS = jobs
+		self.PROCESSES = processes
+		self.WIKI_URL = wiki_url
+
+		self.PARSED = {
+			"GLOBALS": {},
+			"HOOKS": {},
+			"PANELS": {},
+			"ENUMS": {},
+			"CLASSES": {},
+			"LIBRARIES": {},
+			"STRUCTS": {},
+		}
+		self.LINKS = {}
+		self.PAGE_PARSE_QUEUE = Queue()
+		self.FRAGMENT = None
+		self.CHECKPOINT = None
+		# Merged but not rendered yet, see finish_page()
+		self.UNRENDERED = []
+		self.PAGES_LEFT = {}
+
+	def parse(self):
+		with profiler.stage("preload"):
+			cache.preload()
+
+		with profiler.stage("sidebar"):
+			self.parse_sidebar()
+		self.TREE = None
 
 		# Process queue
+		if self.INCREMENTAL: self.load_fragments()
 		self.process_page_parse_queue()
+		if self.INCREMENTAL: self.save_fragments()
+		cache.unload()
 
 		# Remove empty stuff
 		def strip_empty_keys(member, id_base=""):
@@ -525,7 +970,7 @@ class WikiParser:
 				if len(key) == 0:
 					print("Stripped \"" + id_base + key + "\" (empty key)")
 					if ("LINK" in member[key]):
-						print(WIKI_URL + "/gmod/" + member[key]["LINK"])
+						print(self.WIKI_URL + "/gmod/" + member[key]["LINK"])
 					del member[key]
 				elif "members" in member[key]:
 					strip_empty_keys(member[key]["members"], id_base + key + ".")
@@ -533,5 +978,27 @@ class WikiParser:
 		for category, items in self.PARSED.items():
 			strip_empty_keys(items)
 
-def scrape(*args):
-	return WikiParser(*args).PARSED
\ No newline at end of file
+		with profiler.stage("inheritance"):
+			resolve_inheritance(self.PARSED)
+
+# Page parsing worker processes, which need nothing from the sidebar since markups are rendered afterwards
+def init_parse_worker():
+	global worker_parser
+	worker_parser = WikiParser()
+
+# Returns the fragment along with how long it took to parse, in wall and CPU time
+def parse_page_fragment(process_name, body, page_def):
+	wall, cpu = time.perf_counter(), time.process_time()
+	fragment = worker_parser.parse_fragment(getattr(worker_parser, process_name), body, page_def)
+	# Rendering is up to the parent, which gets the fragment
+	worker_parser.UNRENDERED.clear()
+	return fragment, time.perf_counter() - wall, time.process_time() - cpu
+
+# The sidebar, the preloaded pages and the parser are all let go of before compact() turns the scrape into records,
+# which it does entry by entry in place, so the dicts go as the records come
+def scrape(*args, **kwargs):
+	parser = WikiParser(*args, **kwargs)
+	parser.parse()
+	wiki_scrape = parser.PARSED
+	del parser
+	return compact(wiki_scrape)
\ No newline at end of file
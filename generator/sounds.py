@@ -0,0 +1,196 @@
+# Sound catalogue for completions, built from the games' sound files
+#
+#   python sounds.py build <listing or content directory> [--output-dir ../resources]
+#   python sounds.py index [sounds.json] [--output-dir ../resources]
+#   python sounds.py compare [sounds.json]
+#
+# build writes sounds.json and sounds.index.json from either
+#   a listing, one "<game>/<path>" per line relative to the game's sound/ directory
+#   a content directory with a folder per game, holding a sound/ folder (or the sound files themselves)
+#
+# index writes sounds.index.json for the shipped sounds.json, for when there's no listing or content to build from
+#
+# compare turns the shipped sounds.json into a listing, builds both files from it again,
+# and checks that sounds.json comes out byte for byte the same and that the index decodes back to it
+#
+# sounds.json is the nested tree the extension has always read: {game: {path, children, files}}, where every
+# directory has its own path, its subdirectories in children ([] when there are none) and its sorted file names.
+#
+# sounds.index.json is the same catalogue as a prefix tree keyed by directory, so completing a path is one lookup:
+#   VERSION  bumped whenever the layout changes
+#   GAMES    game names, a file's or directory's games are a bitmask over these
+# The extension completes sounds from the index, building a directory's completion list the first time it's needed.
+#   DIRS     directory path ("" for the root, otherwise ending in /) -> completion index of that directory
+#              DIRS   [name, games] per subdirectory
+#              FILES  [prefix, suffix, games] per file, sorted, where the name is the first prefix characters
+#                     of the previous file's name followed by suffix
+# A file or directory that several games share is only listed once.
+
+import json
+import os, os.path
+import sys
+
+from cli import get_arg_value
+from output import write_json
+
+SOUNDS_INDEX_VERSION = 1
+SOUND_EXTENSIONS = (".wav", ".mp3", ".ogg")
+
+def read_listing(path):
+	files = {}
+	f = open(path, "r", encoding="utf-8")
+	for line in f:
+		line = line.strip().replace("\\", "/")
+		if len(line) == 0 or line.startswith("#"): continue
+		game, _, file = line.partition("/")
+		if file: files.setdefault(game, set()).add(file)
+	f.close()
+	return files
+
+def scan_content(directory):
+	files = {}
+	for game in sorted(os.listdir(directory)):
+		root = os.path.join(directory, game)
+		if not os.path.isdir(root): continue
+		if os.path.isdir(os.path.join(root, "sound")): root = os.path.join(root, "sound")
+
+		for dir_path, _, file_names in os.walk(root):
+			for file_name in file_names:
+				if file_name.lower().endswith(SOUND_EXTENSIONS):
+					files.setdefault(game, set()).add(os.path.relpath(os.path.join(dir_path, file_name), root).replace(os.sep, "/"))
+	return files
+
+def flatten_tree(sounds):
+	files = {}
+	def step(game, tree):
+		for file in tree["files"]:
+			files.setdefault(game, set()).add(tree["path"] + file)
+		for child in (tree["children"] or {}).values():
+			step(game, child)
+
+	for game, tree in sounds.items():
+		step(game, tree)
+	return files
+
+def build_tree(files):
+	sounds = {}
+	for game in sorted(files):
+		root = sounds[game] = {"path": "", "children": {}, "files": []}
+		for file in files[game]:
+			*folders, name = file.split("/")
+			tree = root
+			for folder in folders:
+				if folder not in tree["children"]:
+					tree["children"][folder] = {"path": tree["path"] + folder + "/", "children": {}, "files": []}
+				tree = tree["children"][folder]
+			tree["files"].append(name)
+
+	def finish(tree):
+		tree["files"].sort()
+		tree["children"] = {folder: finish(tree["children"][folder]) for folder in sorted(tree["children"])} or []
+		return tree
+
+	for tree in sounds.values(): finish(tree)
+	return sounds
+
+def build_index(files):
+	games = sorted(files)
+
+	dirs = {}
+	def get_dir(path):
+		if path not in dirs: dirs[path] = ({}, {})
+		return dirs[path]
+
+	for bit, game in enumerate(games):
+		for file in files[game]:
+			path, _, name = file.rpartition("/")
+			path = path + "/" if path else ""
+
+			subdirs, dir_files = get_dir(path)
+			dir_files[name] = dir_files.get(name, 0) | 1 << bit
+
+			# Walk back up, marking every directory on the way as having this game
+			while path:
+				parent, _, folder = path[:-1].rpartition("/")
+				parent = parent + "/" if parent else ""
+				subdirs, _ = get_dir(parent)
+				subdirs[folder] = subdirs.get(folder, 0) | 1 << bit
+				path = parent
+
+	index = {}
+	for path in sorted(dirs):
+		subdirs, dir_files = dirs[path]
+
+		encoded_files = []
+		previous = ""
+		for name in sorted(dir_files):
+			prefix = os.path.commonprefix([previous, name])
+			encoded_files.append([len(prefix), name[len(prefix):], dir_files[name]])
+			previous = name
+
+		index[path] = {"DIRS": [[folder, subdirs[folder]] for folder in sorted(subdirs)], "FILES": encoded_files}
+
+	return {"VERSION": SOUNDS_INDEX_VERSION, "GAMES": games, "DIRS": index}
+
+def decode_index(index):
+	files = {game: set() for game in index["GAMES"]}
+	for path, completions in index["DIRS"].items():
+		name = ""
+		for prefix, suffix, games in completions["FILES"]:
+			name = name[:prefix] + suffix
+			for bit, game in enumerate(index["GAMES"]):
+				if games & 1 << bit: files[game].add(path + name)
+	return files
+
+def write_catalogue(files, output_dir):
+	write_json(build_tree(files), [os.path.join(output_dir, "sounds.json")])
+	write_json(build_index(files), [os.path.join(output_dir, "sounds.index.json")])
+
+def read_sounds(path):
+	f = open(path, "r", encoding="utf-8")
+	shipped = f.read()
+	f.close()
+	return shipped
+
+def compare(path):
+	shipped = read_sounds(path)
+
+	files = flatten_tree(json.loads(shipped))
+	print("{files} files in {games} games".format(files = sum(len(game_files) for game_files in files.values()), games = len(files)))
+
+	ok = True
+	if json.dumps(build_tree(files), separators=(",", ":")) != shipped:
+		print("FAILED, sounds.json doesn't come out the same when built from its own files")
+		ok = False
+
+	index = build_index(files)
+	encoded = json.dumps(index, separators=(",", ":"))
+	if decode_index(json.loads(encoded)) != files:
+		print("FAILED, sounds.index.json doesn't decode back to the same files")
+		ok = False
+
+	print("sounds.json {shipped} bytes, sounds.index.json {index} bytes, {dirs} directories".format(shipped = len(shipped), index = len(encoded), dirs = len(index["DIRS"])))
+	return ok
+
+def main():
+	output_dir = get_arg_value("--output-dir", "../resources")
+
+	if len(sys.argv) > 2 and sys.argv[1] == "build":
+		source = sys.argv[2]
+		files = scan_content(source) if os.path.isdir(source) else read_listing(source)
+		write_catalogue(files, output_dir)
+		print("Wrote {files} sounds from {games} games".format(files = sum(len(game_files) for game_files in files.values()), games = len(files)))
+	elif len(sys.argv) > 1 and sys.argv[1] == "index":
+		files = flatten_tree(json.loads(read_sounds(sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] != "--output-dir" else os.path.join(output_dir, "sounds.json"))))
+		write_json(build_index(files), [os.path.join(output_dir, "sounds.index.json")])
+		print("Wrote the index of {files} sounds from {games} games".format(files = sum(len(game_files) for game_files in files.values()), games = len(files)))
+	elif len(sys.argv) > 1 and sys.argv[1] == "compare":
+		if not compare(sys.argv[2] if len(sys.argv) > 2 else os.path.join(output_dir, "sounds.json")):
+			sys.exit(1)
+		print("OK")
+	else:
+		print("usage: python sounds.py build <listing or content directory> [--output-dir DIR] | index [sounds.json] [--output-dir DIR] | compare [sounds.json]")
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,119 @@
+# Shared by every test: a stand-in for the wiki on localhost, served from fixtures/site.json, and a scratch
+# working directory, since the generator reads and writes scrape/ and ../resources/ relative to where it runs
+#
+#   python -m pytest generator/tests
+#
+# fixtures/site.json  {"sidebar": the /gmod/ page, "pages": {"/gmod/<page>": its ?format=text body}}
+# fixtures/wiki.json  what scraping site.json comes out as, see test_golden.py for updating it
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote
+import json
+import os, os.path
+import sys
+import threading
+
+import pytest
+
+GENERATOR_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, GENERATOR_PATH)
+
+def read_fixture(name):
+	f = open(os.path.join(FIXTURES_PATH, name), "r", encoding="utf-8")
+	obj = json.loads(f.read())
+	f.close()
+	return obj
+
+class WikiHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	# Headers and body go out as separate writes, which Nagle would hold back for a delayed ACK on every request
+	disable_nagle_algorithm = True
+
+	def log_message(self, *args):
+		pass
+
+	def do_GET(self):
+		server = self.server.WIKI
+		path = unquote(self.path)
+		with server.LOCK:
+			server.REQUESTS.append(path)
+			failures = server.FAILURES.get(path)
+			failure = failures.pop(0) if failures else None
+
+		if failure is not None:
+			status, headers = failure
+			return self.send(status, b"", headers)
+
+		if path == "/gmod/":
+			body = server.SITE["sidebar"]
+		elif path.endswith("?format=text") and path.removesuffix("?format=text") in server.SITE["pages"]:
+			body = server.SITE["pages"][path.removesuffix("?format=text")]
+		else:
+			return self.send(404, b"Not found")
+		self.send(200, body.encode("utf-8"))
+
+	def send(self, status, body, headers={}):
+		self.send_response(status)
+		for name, value in headers.items():
+			self.send_header(name, value)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+class WikiServer:
+	def __init__(self, site):
+		self.SITE = site
+		self.REQUESTS = []
+		self.FAILURES = {}
+		self.LOCK = threading.Lock()
+
+		self.HTTPD = ThreadingHTTPServer(("127.0.0.1", 0), WikiHandler)
+		self.HTTPD.daemon_threads = True
+		self.HTTPD.WIKI = self
+		self.URL = "http://127.0.0.1:" + str(self.HTTPD.server_address[1])
+		self.THREAD = threading.Thread(target=self.HTTPD.serve_forever, daemon=True)
+		self.THREAD.start()
+
+	# The next len(responses) requests for path get these (status, headers) instead of the page
+	def fail(self, path, *responses):
+		with self.LOCK:
+			self.FAILURES.setdefault(path, []).extend(responses)
+
+	def count(self, path):
+		with self.LOCK:
+			return self.REQUESTS.count(path)
+
+	def close(self):
+		self.HTTPD.shutdown()
+		self.HTTPD.server_close()
+
+@pytest.fixture
+def wiki_server():
+	server = WikiServer(read_fixture("site.json"))
+	yield server
+	server.close()
+
+# Runs the test from an empty generator/ with a resources/ next to it, and a page cache of its own
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+	import scrape
+	from cache import PackedPageCache
+
+	path = tmp_path / "generator"
+	(path / "scrape").mkdir(parents=True)
+	(tmp_path / "resources").mkdir()
+	monkeypatch.chdir(path)
+
+	# Whatever a test changes about how pages are fetched is put back afterwards
+	monkeypatch.setattr(scrape, "cache", PackedPageCache())
+	for name in ("http", "limiter", "REQUEST_RETRIES", "REQUEST_TIMEOUT"):
+		monkeypatch.setattr(scrape, name, getattr(scrape, name))
+	monkeypatch.setattr(scrape, "BACKOFF_BASE", 0.01)
+
+	yield path
+	scrape.cache.close()
+
+def scrape_fixture(wiki_server, **kwargs):
+	import scrape
+	return scrape.scrape(quiet=True, wiki_url=wiki_server.URL, **kwargs)
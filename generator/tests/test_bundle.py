@@ -0,0 +1,66 @@
+# wiki.bundle round trips and name lookups, over the golden scrape
+
+import copy
+
+import pytest
+
+from bundle import Bundle, write_bundle
+from conftest import read_fixture
+from records import compact
+
+@pytest.fixture
+def wiki_scrape():
+	return read_fixture("wiki.json")
+
+def open_bundle(wiki_scrape, path):
+	write_bundle(wiki_scrape, str(path))
+	return Bundle(str(path))
+
+def test_round_trip(wiki_scrape, tmp_path):
+	bundle = open_bundle(wiki_scrape, tmp_path / "wiki.bundle")
+	try:
+		assert bundle.to_json() == wiki_scrape
+	finally:
+		bundle.close()
+
+# main.py bundles the records the scrape is compacted into, not dicts
+def test_round_trip_records(wiki_scrape, tmp_path):
+	bundle = open_bundle(compact(copy.deepcopy(wiki_scrape)), tmp_path / "wiki.bundle")
+	try:
+		assert bundle.to_json() == wiki_scrape
+	finally:
+		bundle.close()
+
+def test_find(wiki_scrape, tmp_path):
+	bundle = open_bundle(wiki_scrape, tmp_path / "wiki.bundle")
+	try:
+		found = 0
+		for category in wiki_scrape:
+			for index in bundle.category(category):
+				entry = bundle.entry(index)
+				if "SEARCH" not in entry: continue
+				nodes = bundle.find(category, entry["SEARCH"])
+				assert index in nodes
+				assert all(bundle.entry(node)["SEARCH"] == entry["SEARCH"] for node in nodes)
+				found += 1
+		assert found == bundle.NAME_COUNT
+
+		assert bundle.entry(bundle.find("GLOBALS", "Glob3")[0])["LINK"] == "Global.Glob3"
+		assert bundle.find("GLOBALS", "Glob") == []
+		assert bundle.find("GLOBALS", "zzz") == []
+		assert bundle.find("CLASSES", "Glob3") == []
+	finally:
+		bundle.close()
+
+# Names are sorted by their UTF-8 bytes, which isn't the order Python sorts strings in
+def test_find_unicode(tmp_path):
+	names = ["b", "a", "é", "\U0001f600", "Ａ", "a", "B"]
+	wiki_scrape = {"GLOBALS": {str(i): {"SEARCH": name} for i, name in enumerate(names)}, "EMPTY": {}}
+	bundle = open_bundle(wiki_scrape, tmp_path / "wiki.bundle")
+	try:
+		for name in set(names):
+			assert [bundle.get_key(node) for node in bundle.find("GLOBALS", name)] == [str(i) for i, other in enumerate(names) if other == name]
+		assert bundle.find("EMPTY", "a") == []
+		assert bundle.to_json() == wiki_scrape
+	finally:
+		bundle.close()
@@ -0,0 +1,54 @@
+# Fetching from the stand-in wiki through --wiki-url, retries included
+
+import email.utils
+import json
+import sys
+import time
+
+import pytest
+
+from conftest import read_fixture, scrape_fixture
+from test_golden import to_json
+import main
+import scrape
+
+PAGE = "/gmod/Global.Glob1?format=text"
+
+def test_main_wiki_url(wiki_server, workdir, monkeypatch):
+	monkeypatch.setattr(sys, "argv", ["main.py", "scrape", "--wiki-url", wiki_server.URL, "--quiet", "--jobs", "4"])
+	main.main()
+
+	assert json.loads((workdir / main.SCRAPED_PATH).read_text(encoding="utf-8")) == read_fixture("wiki.json")
+	assert wiki_server.count("/gmod/") == 1
+	assert wiki_server.count(PAGE) == 1
+
+def test_retry(wiki_server, workdir):
+	wiki_server.fail(PAGE, (429, {"Retry-After": "0"}), (503, {}), (500, {"Retry-After": "0"}))
+
+	assert to_json(scrape_fixture(wiki_server, jobs=4)) == read_fixture("wiki.json")
+	assert wiki_server.count(PAGE) == 4
+
+def test_retries_exhausted(wiki_server, workdir):
+	scrape.set_retry_policy(retries=2)
+	wiki_server.fail(PAGE, *[(503, {"Retry-After": "0"})] * 3)
+
+	with pytest.raises(Exception, match="HTTP 503"):
+		scrape_fixture(wiki_server)
+	assert wiki_server.count(PAGE) == 3
+
+def test_not_retried(wiki_server, workdir):
+	wiki_server.fail(PAGE, (404, {}))
+
+	with pytest.raises(Exception, match="HTTP 404"):
+		scrape_fixture(wiki_server)
+	assert wiki_server.count(PAGE) == 1
+
+class Response:
+	def __init__(self, retry_after):
+		self.headers = {"Retry-After": retry_after}
+
+def test_retry_after():
+	assert scrape.get_retry_after(Response("2.5")) == 2.5
+	assert scrape.get_retry_after(Response("-1")) == 0
+	assert 8 < scrape.get_retry_after(Response(email.utils.formatdate(time.time() + 10, usegmt=True))) <= 10
+	assert scrape.get_retry_after(Response("soon")) is None
@@ -0,0 +1,50 @@
+# Joining gluadump sources onto the wiki scrape
+
+from gluadump import inject_src
+
+def make_wiki_scrape():
+	return {
+		"GLOBALS": {
+			"Glob1": {"SEARCH": "Glob1", "FUNCTION": True},
+			# The wiki gives its own source for this one, but the dump doesn't have it
+			"Glob2": {"SEARCH": "Glob2", "FUNCTION": True, "SRC": ["lua/includes/util.lua", "10"]},
+		},
+		"LIBRARIES": {
+			"lib": {"SEARCH": "lib", "MEMBERS": {
+				"Func": {"SEARCH": "lib.Func", "FUNCTION": True},
+				"Missing": {"SEARCH": "lib.Missing", "FUNCTION": True},
+			}},
+		},
+		"CLASSES": {
+			"Entity": {"SEARCH": "Entity", "MEMBERS": {
+				"Health": {"SEARCH": "Entity:Health", "FUNCTION": True, "METHOD": True},
+			}},
+		},
+		"PANELS": {},
+	}
+
+def test_inject_src():
+	dump = {
+		"Glob1": {"src": {"client": ["lua/a.lua", 1, 5], "server": ["lua/a.lua", 1, 5]}},
+		"Undocumented": {"src": {"server": ["lua/b.lua", 3, 4]}},
+		"lib": {"members": {
+			"Func": {"src": {"client": ["lua/lib.lua", 7, 9], "server": ["lua/lib_sv.lua", 2, 3]}},
+		}},
+		"metatables": {
+			"Entity": {"members": {"Health": {"src": {"server": ["lua/ent.lua", 20, 22]}}}},
+		},
+	}
+	wiki_scrape = make_wiki_scrape()
+
+	assert inject_src(dump, wiki_scrape) == {"MATCHED": 3, "UNDOCUMENTED": 1, "MISSED": 2}
+
+	assert wiki_scrape["GLOBALS"]["Glob1"]["SRC"] == ["lua/a.lua", "1-5"]
+	assert "SRC_REALMS" not in wiki_scrape["GLOBALS"]["Glob1"]
+	assert wiki_scrape["GLOBALS"]["Glob2"]["SRC"] == ["lua/includes/util.lua", "10"]
+
+	func = wiki_scrape["LIBRARIES"]["lib"]["MEMBERS"]["Func"]
+	assert func["SRC"] == ["lua/lib.lua", "7-9"]
+	assert func["SRC_REALMS"] == {"CLIENT": ["lua/lib.lua", "7-9"], "SERVER": ["lua/lib_sv.lua", "2-3"]}
+
+	assert wiki_scrape["CLASSES"]["Entity"]["MEMBERS"]["Health"]["SRC"] == ["lua/ent.lua", "20-22"]
+	assert "SRC" not in wiki_scrape["LIBRARIES"]["lib"]["MEMBERS"]["Missing"]
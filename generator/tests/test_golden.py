@@ -0,0 +1,50 @@
+# Scrapes the stand-in wiki and compares it with fixtures/wiki.json, which pins down everything a page turns into,
+# markup rendering included. After a change that's meant to alter the output, rewrite the golden file with
+#
+#   UPDATE_GOLDEN=1 python -m pytest generator/tests/test_golden.py
+#
+# and check its diff
+
+import json
+import os, os.path
+
+import pytest
+
+from conftest import FIXTURES_PATH, read_fixture, scrape_fixture
+from output import ENCODER
+
+# Records and wiki.json read back in compare the same once they've both been through JSON
+def to_json(wiki_scrape):
+	return json.loads(ENCODER.encode(wiki_scrape))
+
+def test_golden(wiki_server, workdir):
+	wiki_scrape = to_json(scrape_fixture(wiki_server))
+
+	if os.environ.get("UPDATE_GOLDEN"):
+		f = open(os.path.join(FIXTURES_PATH, "wiki.json"), "w", encoding="utf-8", newline="\n")
+		f.write(json.dumps(wiki_scrape, indent="\t") + "\n")
+		f.close()
+
+	assert wiki_scrape == read_fixture("wiki.json")
+
+# Fetching, parsing and merging pages some other way mustn't change a thing
+@pytest.mark.parametrize("options", [
+	{"jobs": 4},
+	{"processes": 2},
+	{"processes": 2, "jobs": 4},
+	{"incremental": True},
+	{"checkpoint": True},
+])
+def test_golden_options(wiki_server, workdir, options):
+	assert to_json(scrape_fixture(wiki_server, **options)) == read_fixture("wiki.json")
+
+def test_golden_cached(wiki_server, workdir):
+	scrape_fixture(wiki_server)
+	requests = len(wiki_server.REQUESTS)
+
+	assert to_json(scrape_fixture(wiki_server, cached=True)) == read_fixture("wiki.json")
+	assert len(wiki_server.REQUESTS) == requests
+
+def test_golden_incremental_reuse(wiki_server, workdir):
+	scrape_fixture(wiki_server, incremental=True)
+	assert to_json(scrape_fixture(wiki_server, cached=True, incremental=True)) == read_fixture("wiki.json")
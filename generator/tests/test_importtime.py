@@ -0,0 +1,18 @@
+# The stages after scrape run for real with -X importtime, and mustn't load what only scraping needs
+
+import pytest
+
+from benchmark import IMPORTTIME_STAGES, SCRAPE_ONLY_MODULES, get_import_times
+
+# A module each stage can't run without, to be sure it really got going
+STAGE_MODULES = {
+	"merge": "gluadump",
+	"emit": "bundle",
+}
+
+@pytest.mark.parametrize("stage", list(IMPORTTIME_STAGES))
+def test_no_scrape_imports(stage):
+	modules = get_import_times(stage, IMPORTTIME_STAGES[stage])
+
+	assert STAGE_MODULES[stage] in modules
+	assert [name for name in modules if name.split(".")[0] in SCRAPE_ONLY_MODULES] == []
@@ -0,0 +1,51 @@
+# The inheritance examples of inheritance.py, and member lookups through INHERITS and INHERITED
+
+import pytest
+
+from inheritance import EXAMPLES, make_example, resolve_inheritance
+
+@pytest.mark.parametrize("panels, classes, expected, expected_missing, expected_cycles", EXAMPLES)
+def test_examples(panels, classes, expected, expected_missing, expected_cycles):
+	wiki_scrape = make_example(panels, classes)
+	missing, cycles = resolve_inheritance(wiki_scrape, quiet=True)
+
+	entries = {**wiki_scrape["CLASSES"], **wiki_scrape["PANELS"]}
+	assert {name: (entries[name].get("INHERITS"), entries[name].get("INHERITED")) for name in expected} == expected
+	assert missing == expected_missing
+	assert cycles == expected_cycles
+
+# How the extension is meant to look a member up: its own, then INHERITED, then the last ancestor
+def lookup(wiki_scrape, entry, member):
+	if member in entry["MEMBERS"]: return entry["MEMBERS"][member]
+	if "INHERITS" not in entry: return None
+
+	index = entry.get("INHERITED", {}).get(member, len(entry["INHERITS"]) - 1)
+	category, name = entry["INHERITS"][index]
+	return wiki_scrape[category][name]["MEMBERS"].get(member)
+
+# ...which has to find the same as following PARENT the long way
+def walk(wiki_scrape, entry, member):
+	for ancestor in [entry] + [wiki_scrape[category][name] for category, name in entry.get("INHERITS", [])]:
+		if member in ancestor["MEMBERS"]: return ancestor["MEMBERS"][member]
+
+def test_lookup():
+	wiki_scrape = make_example({
+		"DImageButton": ("DButton", ["SetImage", "Paint"]),
+		"DButton": ("DLabel", ["DoClick", "SetText"]),
+		"DLabel": ("EditablePanel", ["SetText", "SetFont"]),
+		"EditablePanel": ("Panel", ["SetFocusTopLevel"]),
+		"DFrame": ("EditablePanel", ["SetTitle", "Paint"]),
+		"DOrphan": ("DMissing", ["Think"]),
+		"DChild": ("DOrphan", ["Paint"]),
+	}, {"Panel": (None, ["SetText", "Remove", "Paint", "SetFocusTopLevel"])})
+	resolve_inheritance(wiki_scrape, quiet=True)
+
+	members = {member for category in wiki_scrape.values() for entry in category.values() for member in entry["MEMBERS"]}
+	for category in wiki_scrape.values():
+		for entry in category.values():
+			for member in members | {"Nothing"}:
+				assert lookup(wiki_scrape, entry, member) is walk(wiki_scrape, entry, member)
+
+	# Only what doesn't come from Panel is listed
+	assert wiki_scrape["PANELS"]["DFrame"]["INHERITED"] == {"SetFocusTopLevel": 0}
+	assert "INHERITED" not in wiki_scrape["PANELS"]["EditablePanel"]
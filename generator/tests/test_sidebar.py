@@ -0,0 +1,23 @@
+# The sidebar, sorted out in one walk, has to queue exactly what the selector scans it replaced did
+
+import json
+
+from benchmark import SelectorSidebarParser, parse_sidebar_skeleton
+from conftest import read_fixture
+import scrape
+
+def test_same_as_selectors(wiki_server, workdir):
+	skeleton = parse_sidebar_skeleton(scrape.WikiParser, wiki_server.URL, cached=False)
+	assert skeleton == parse_sidebar_skeleton(SelectorSidebarParser, wiki_server.URL)
+
+	# Every page but the panel hooks, once each
+	parsed, queue = json.loads(skeleton)
+	pages = set(read_fixture("site.json")["pages"]) - {"/gmod/DFrame_HOOKS", "/gmod/DFrame:OnClose"}
+	assert sorted(url for process, url, page_def in queue) == sorted(pages)
+
+# The panels' hooks come before the panels in the sidebar, but still mustn't turn up as hook families
+def test_panel_hooks(wiki_server, workdir):
+	parsed, queue = json.loads(parse_sidebar_skeleton(scrape.WikiParser, wiki_server.URL, cached=False))
+
+	assert "DFrame" in parsed["PANELS"]
+	assert set(parsed["HOOKS"]) == {"GM", "ENT", "SWEP", "EFFECT"}
@@ -0,0 +1,80 @@
+# sounds.json and sounds.index.json, built from the shipped catalogue and from a listing or content directory
+
+import json
+import os.path
+
+import pytest
+
+from conftest import GENERATOR_PATH
+from sounds import build_index, build_tree, decode_index, flatten_tree, read_listing, scan_content, write_catalogue
+
+RESOURCES_PATH = os.path.join(os.path.dirname(GENERATOR_PATH), "resources")
+
+def read_resource(name):
+	f = open(os.path.join(RESOURCES_PATH, name), "r", encoding="utf-8")
+	text = f.read()
+	f.close()
+	return text
+
+@pytest.fixture(scope="module")
+def shipped():
+	return read_resource("sounds.json")
+
+# What the extension does to complete a directory, see getSoundCompletions in src/completionProvider.js
+def lookup(index, path):
+	completions = index["DIRS"].get(path)
+	if completions is None: return None
+
+	files = []
+	name = ""
+	for prefix, suffix, games in completions["FILES"]:
+		name = name[:prefix] + suffix
+		files.append((name, [game for bit, game in enumerate(index["GAMES"]) if games & 1 << bit]))
+	return [(folder, [game for bit, game in enumerate(index["GAMES"]) if games & 1 << bit]) for folder, games in completions["DIRS"]], files
+
+def test_build_tree(shipped):
+	assert json.dumps(build_tree(flatten_tree(json.loads(shipped))), separators=(",", ":")) == shipped
+
+def test_index_round_trip(shipped):
+	files = flatten_tree(json.loads(shipped))
+	assert decode_index(json.loads(json.dumps(build_index(files)))) == files
+
+# The extension reads the index, so it has to be kept up to date with sounds.json
+def test_shipped_index(shipped):
+	assert json.loads(read_resource("sounds.index.json")) == build_index(flatten_tree(json.loads(shipped)))
+
+def test_lookup():
+	index = build_index({
+		"hl2": {"ambient/wind1.wav", "ambient/wind2.wav", "ambient/fire/fire1.wav", "npc/zombie.wav"},
+		"garrysmod": {"ambient/wind1.wav", "garrysmod/ui_click.wav"},
+	})
+	assert index["GAMES"] == ["garrysmod", "hl2"]
+
+	assert lookup(index, "") == ([("ambient", ["garrysmod", "hl2"]), ("garrysmod", ["garrysmod"]), ("npc", ["hl2"])], [])
+	assert lookup(index, "ambient/") == ([("fire", ["hl2"])], [("wind1.wav", ["garrysmod", "hl2"]), ("wind2.wav", ["hl2"])])
+	assert lookup(index, "ambient/fire/") == ([], [("fire1.wav", ["hl2"])])
+	assert lookup(index, "ambient/water/") is None
+
+	# wind2.wav shares "wind" with the file before it
+	assert index["DIRS"]["ambient/"]["FILES"] == [[0, "wind1.wav", 3], [4, "2.wav", 2]]
+
+def test_listing_and_content(tmp_path):
+	files = {"hl2": {"ambient/wind1.wav", "npc/zombie.mp3"}, "css": {"radio/go.wav"}}
+
+	listing = tmp_path / "listing.txt"
+	listing.write_text("# game/path\nhl2/ambient/wind1.wav\nhl2\\npc\\zombie.mp3\n\ncss/radio/go.wav\n", encoding="utf-8")
+	assert read_listing(str(listing)) == files
+
+	content = tmp_path / "content"
+	for game, game_files in files.items():
+		# hl2 keeps its sounds in sound/, css has them at the top
+		root = content / game / "sound" if game == "hl2" else content / game
+		for file in game_files:
+			(root / file).parent.mkdir(parents=True, exist_ok=True)
+			(root / file).write_bytes(b"")
+	(content / "hl2" / "sound" / "ambient" / "readme.txt").write_bytes(b"")
+	assert scan_content(str(content)) == files
+
+	write_catalogue(files, str(tmp_path))
+	assert flatten_tree(json.loads((tmp_path / "sounds.json").read_text(encoding="utf-8"))) == files
+	assert decode_index(json.loads((tmp_path / "sounds.index.json").read_text(encoding="utf-8"))) == files
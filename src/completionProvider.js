@@ -101,75 +101,54 @@ class CompletionProvider {
 	}
 
 	initSounds() {
-		let CompletionProvider = this;
+		// Directory path ("" or ending in /) -> its completions, see generator/sounds.py for the layout
+		this.soundsIndex = require("../resources/sounds.index.json");
 
-		this.sounds = { list: new vscode.CompletionList(undefined, false), all: new vscode.CompletionList(undefined, false) };
+		// Completion lists are only built for the directories that actually get completed
+		this.sounds = {};
 
-		let sound_game_sort = {"garrysmod": "1", "hl2": "2", "css": "3", "tf2": "4"};
+		console.log("vscode-glua initialized sounds");
+	}
 
-		function step(game, sounds_tree) {
-			for (const [folder, data] of Object.entries(sounds_tree.children)) {
-				step(game, data);
-			}
-			for (let i = 0; i < sounds_tree.files.length; i++) {
-				let file = sounds_tree.files[i];
+	getSoundCompletions(path) {
+		if (path in this.sounds) return this.sounds[path];
 
-				var completionItem = new vscode.CompletionItem(game + "! " + file, vscode.CompletionItemKind.File);
-				completionItem.detail = "(" + game + ")";
-				completionItem.DOC_TAG = false;
-				completionItem.insertText = file;
-				completionItem.sortText = game in sound_game_sort ? ("2" + sound_game_sort[game]) : "25";
-				
-				let folders = sounds_tree.path.replace(/\/$/, "").split("/");
-				let traverseStack = CompletionProvider.sounds.all;
-				let traverseStackGame = CompletionProvider.sounds[game];
-				for (let j = 0; j < folders.length; j++) {
-					let folder = folders[j] + "/";
-
-					if (!(folder in traverseStack) || !(folder in traverseStackGame)) {
-						let folderCompletionItem = new vscode.CompletionItem(game + "! " + folder, vscode.CompletionItemKind.Folder);
-						folderCompletionItem.detail = completionItem.detail;
-						folderCompletionItem.DOC_TAG = false;
-						folderCompletionItem.insertText = folders[j];
-						folderCompletionItem.sortText = game in sound_game_sort ? ("1" + sound_game_sort[game]) : "15";
-
-						if (!(folder in traverseStack)) {
-							traverseStack.items.push(folderCompletionItem);
-							
-							traverseStack[folder] = new vscode.CompletionList(undefined, false);
-						}
-						if (!(folder in traverseStackGame)) {
-							let gameCompletionItem = Object.create(folderCompletionItem);
-							gameCompletionItem.label = folder;
-							traverseStackGame.items.push(gameCompletionItem);
+		let completions = this.soundsIndex.DIRS[path];
+		if (completions === undefined) return null;
 
-							traverseStackGame[folder] = new vscode.CompletionList(undefined, false);
-						}
-					}
+		let games = this.soundsIndex.GAMES;
+		let sound_game_sort = {"garrysmod": "1", "hl2": "2", "css": "3", "tf2": "4"};
+		let list = new vscode.CompletionList(undefined, false);
+
+		function addItem(game, label, insertText, kind, sort) {
+			let completionItem = new vscode.CompletionItem(game + "! " + label, kind);
+			completionItem.detail = "(" + game + ")";
+			completionItem.DOC_TAG = false;
+			completionItem.insertText = insertText;
+			completionItem.sortText = game in sound_game_sort ? (sort + sound_game_sort[game]) : (sort + "5");
+			list.items.push(completionItem);
+		}
 
-					traverseStack = traverseStack[folder];
-					traverseStackGame = traverseStackGame[folder];
-				
-					if (j === folders.length - 1) {
-						traverseStack.items.push(completionItem);
-						
-						let gameCompletionItem = Object.create(completionItem);
-						gameCompletionItem.label = file;
-						traverseStackGame.items.push(gameCompletionItem);
-					}
+		for (const [folder, gameBits] of completions.DIRS) {
+			// A folder that several games have is only listed once, under the first of them
+			for (let bit = 0; bit < games.length; bit++) {
+				if (gameBits & (1 << bit)) {
+					addItem(games[bit], folder + "/", folder, vscode.CompletionItemKind.Folder, "1");
+					break;
 				}
-
-				var completionItem = Object.create(completionItem);
-				completionItem.insertText = sounds_tree.path + file;
-				completionItem.label = game + "! " + sounds_tree.path + file;
 			}
 		}
-		for (const [game, sounds_tree] of Object.entries(require("../resources/sounds.json"))) {
-			this.sounds[game] = new vscode.CompletionList(undefined, false);
-			step(game, sounds_tree, sounds_tree.path);
+
+		let file = "";
+		for (const [prefix, suffix, gameBits] of completions.FILES) {
+			file = file.substring(0, prefix) + suffix;
+			for (let bit = 0; bit < games.length; bit++) {
+				if (gameBits & (1 << bit)) addItem(games[bit], file, file, vscode.CompletionItemKind.File, "2");
+			}
 		}
 
-		console.log("vscode-glua initialized sounds");
+		this.sounds[path] = list;
+		return list;
 	}
 
 	initMaterials() {
@@ -187,35 +166,64 @@ class CompletionProvider {
 		flags16.sortText = "3";
 		this.materials.items.push(flags16);
 
-		fs.readdir(this.GLua.extension.asAbsolutePath("resources/materials/icon16/"), (err, files) => {
-			if (err) { console.warn("vscode-glua failed to read ../resources/materials/icon16/ (\"" + err + "\")") } else {
-				for (let i = 0; i < files.length; i++) {
-					let file = files[i];
-
-					let completionItem = this.createCompletionItem(undefined, file, vscode.CompletionItemKind.File, undefined, file);
-					completionItem.DOC_TAG = "materials/icon16/" + file;
+		// generator/materials.py lists everything up front, reading the directories is only a fallback
+		let manifest;
+		try {
+			manifest = require("../resources/materials.json");
+		} catch (err) {
+			console.warn("vscode-glua failed to read ../resources/materials.json (\"" + err + "\"), reading the material directories instead");
+		}
 
-					this.materials["icon16/"].items.push(completionItem);
-					this.docs["materials/icon16/" + file] = { "RAW_IMAGE": this.GLua.extension.asAbsolutePath("resources/materials/icon16/" + file) };
-				}
+		if (manifest) {
+			for (const [folder, folder_def] of Object.entries(manifest.DIRS)) {
+				this.addMaterials(folder, folder_def.FILES.map((file_def) => file_def.NAME), (file, i) => {
+					let file_def = folder_def.FILES[i];
+					if ("DATA" in file_def) return { "IMAGE_URI": file_def.DATA };
+					if ("PATH" in folder_def) return { "RAW_IMAGE": this.GLua.extension.asAbsolutePath(folder_def.PATH + file) };
+				});
+			}
+		} else {
+			for (const folder of ["icon16/", "flags16/"]) {
+				fs.readdir(this.GLua.extension.asAbsolutePath("resources/materials/" + folder), (err, files) => {
+					if (err) { console.warn("vscode-glua failed to read ../resources/materials/" + folder + " (\"" + err + "\")") } else {
+						this.addMaterials(folder, files, (file) => ({ "RAW_IMAGE": this.GLua.extension.asAbsolutePath("resources/materials/" + folder + file) }));
+					}
+				});
 			}
-		});
+		}
 
-		fs.readdir(this.GLua.extension.asAbsolutePath("resources/materials/flags16/"), (err, files) => {
-			if (err) { console.warn("vscode-glua failed to read ../resources/materials/flags16/ (\"" + err + "\")") } else {
-				for (let i = 0; i < files.length; i++) {
-					let file = files[i];
+		console.log("vscode-glua initialized materials");
+	}
 
-					let completionItem = this.createCompletionItem(undefined, file, vscode.CompletionItemKind.File, undefined, file);
-					completionItem.DOC_TAG = "materials/flags16/" + file;
+	addMaterials(folder, files, getDoc) {
+		let traverseStack = this.materials;
+		let folders = folder.split("/").filter((v) => v !== "");
+		for (let i = 0; i < folders.length; i++) {
+			let subfolder = folders[i] + "/";
+			if (!(subfolder in traverseStack)) {
+				let folderCompletionItem = this.createCompletionItem(undefined, subfolder, vscode.CompletionItemKind.Folder);
+				folderCompletionItem.DOC_TAG = false;
+				folderCompletionItem.sortText = "4";
+				traverseStack.items.push(folderCompletionItem);
+				traverseStack[subfolder] = new vscode.CompletionList();
+			}
+			traverseStack = traverseStack[subfolder];
+		}
 
-					this.materials["flags16/"].items.push(completionItem);
-					this.docs["materials/flags16/" + file] = { "RAW_IMAGE": this.GLua.extension.asAbsolutePath("resources/materials/flags16/" + file) };
-				}
+		for (let i = 0; i < files.length; i++) {
+			let file = files[i];
+
+			let completionItem = this.createCompletionItem(undefined, file, vscode.CompletionItemKind.File, undefined, file);
+			let doc = getDoc(file, i);
+			if (doc) {
+				completionItem.DOC_TAG = "materials/" + folder + file;
+				this.docs["materials/" + folder + file] = doc;
+			} else {
+				completionItem.DOC_TAG = false;
 			}
-		});
 
-		console.log("vscode-glua initialized materials");
+			traverseStack.items.push(completionItem);
+		}
 	}
 
 	provideScopedCompletionItems(CompletionProvider, document, pos, cancel, ctx, term) {
@@ -588,14 +596,7 @@ class CompletionProvider {
 		if (snd_match) {
 			let path = (snd_match[1] ? snd_match[1] : "").split("/").filter((v) => v !== "").map((v) => v + "/");
 			
-			let traverseStack = CompletionProvider.sounds.all;
-			for (let i = 0; i < path.length; i++) {
-				if (path[i] in traverseStack)
-					traverseStack = traverseStack[path[i]];
-				else {
-					traverseStack = null; break;
-				}
-			}
+			let traverseStack = CompletionProvider.getSoundCompletions(path.join(""));
 		
 			// Search workspace
 			return new Promise(resolve => { new Promise(resolve => {
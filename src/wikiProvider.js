@@ -295,6 +295,11 @@ class WikiProvider {
 				return item;
 			}
 
+			if ("IMAGE_URI" in doc) {
+				item.documentation = new vscode.MarkdownString("![" + escape(item.label) + "](" + doc["IMAGE_URI"] + ")");
+				return item;
+			}
+
 			if ("VMT" in doc) {
 				return this.GLua.VMTProvider.provideVMT(cancel, item, doc["VMT"]);
 			}